@@ -15,17 +15,592 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>
 """
 
-import csv
+import array
+import bisect
+import collections
+import contextlib
 import os
-import datetime
+import posixpath
+import re
+import functools
+import itertools
+import time
 import urllib.parse
-import io
-import pyqrcode
+# pyqrcode, concurrent.futures, csv, hashlib, heapq, io, shutil, sqlite3, tempfile, zipfile and tarfile are imported by the functions that use them,
+# so building urls does not pay for the QR, html and file machinery at import time
 
 '''
 Library for generating valid url schemes and generated html links/pages
 '''
 
+def _quote(string):
+    """
+    supporting function of NavigatorURLScheme to encode a location, name or prompt
+    :param string: value to encode
+    :return: the value encoded for the url
+    """
+    return urllib.parse.quote_plus(string, ",'")
+
+
+class NavigatorURLEncodingCache:
+    """
+    generic class for a bounded cache of encoded locations, names and prompts, shareable across NavigatorURLScheme objects
+    """
+    def __init__(self, maxItems=65536):
+        """
+        constructor for the encoding cache
+        :param maxItems: optional number of encoded values kept, least recently used are evicted first
+        """
+        self.quote = functools.lru_cache(maxsize=maxItems)(_quote)
+
+    def stats(self):
+        """
+        hit/miss statistics of the cache
+        :return: {"hits", "misses", "items", "maxItems"}
+        """
+        info = self.quote.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "items": info.currsize, "maxItems": info.maxsize}
+
+
+_coordinatePattern = re.compile(r"^\s*([-+]?\d+(?:\.\d*)?)\s*,\s*([-+]?\d+(?:\.\d*)?)\s*$")  # 'lat,lon'
+
+
+def _coordinate(location):
+    """
+    reads a 'lat,lon' location
+    :param location: location string i.e. '43.222,-76.444' or an address
+    :return: (lat, lon) in degrees or None for an address
+    """
+    match = _coordinatePattern.match(str(location))
+    if match is None: return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    return (latitude, longitude) if abs(latitude) <= 90 and abs(longitude) <= 180 else None
+
+
+def _progress(stats, message):
+    """
+    supporting function to report the progress of the library, printed unless a NavigatorURLStats collects it
+    :param stats: NavigatorURLStats or None
+    :param message: progress message
+    """
+    if stats is None: print(message)
+    else: stats.progress(message)
+
+
+_noStage = contextlib.nullcontext()  # stands in for NavigatorURLStats.stage when no stats are recorded
+
+
+class NavigatorURLStats:
+    """
+    generic class for opt-in instrumentation of NavigatorURLScheme, NavigatorURLHyperlinks and NavigatorURLQRCode:
+    per-stage wall and cpu time, item counts, bytes written and cache hits, plus the progress messages of the library.
+    pass one object as stats= to any of them, without it the library only pays a None check per call
+    """
+    def __init__(self, callback=None, progress=None):
+        """
+        constructor for the stats
+        :param callback: optional function called as callback(stageName, record) each time a stage is recorded
+        :param progress: optional function called with each progress message, None keeps them in messages
+        """
+        self.stages = {}  # stage name -> {"calls", "items", "bytes", "hits", "misses", "wallSeconds", "cpuSeconds"}
+        self.messages = []
+        self.__callback = callback
+        self.__progress = progress
+
+    @contextlib.contextmanager
+    def stage(self, name, items=1):
+        """
+        times the body as one call of a stage
+        :param name: stage name i.e. "generateURL"
+        :param items: optional number of items processed by the body
+        """
+        wallStart, cpuStart = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = self._record(name)
+            record["calls"] += 1
+            record["items"] += items
+            record["wallSeconds"] += time.perf_counter() - wallStart
+            record["cpuSeconds"] += time.process_time() - cpuStart
+            if self.__callback is not None: self.__callback(name, record)
+
+    def count(self, name, items=0, bytesWritten=0, hits=0, misses=0):
+        """
+        adds counters to a stage without timing it
+        :param name: stage name
+        :param items: optional number of items
+        :param bytesWritten: optional number of bytes written
+        :param hits: optional number of cache hits
+        :param misses: optional number of cache misses
+        """
+        record = self._record(name)
+        record["items"] += items
+        record["bytes"] += bytesWritten
+        record["hits"] += hits
+        record["misses"] += misses
+        if self.__callback is not None: self.__callback(name, record)
+
+    def progress(self, message):
+        """
+        records a progress message of the library
+        :param message: progress message
+        """
+        if self.__progress is not None: self.__progress(message)
+        else: self.messages.append(message)
+
+    def report(self):
+        """
+        formats the stages as a table, slowest first
+        :return: the report string
+        """
+        lines = ["{:<16} {:>8} {:>10} {:>12} {:>8} {:>8} {:>10} {:>10}".format("stage", "calls", "items", "bytes", "hits", "misses", "wall s", "cpu s")]
+        for name, record in sorted(self.stages.items(), key=lambda stage: -stage[1]["wallSeconds"]):
+            lines.append("{:<16} {calls:>8} {items:>10} {bytes:>12} {hits:>8} {misses:>8} {wallSeconds:>10.3f} {cpuSeconds:>10.3f}".format(name, **record))
+        return "\n".join(lines)
+
+    def _record(self, name):
+        """
+        supporting function of stage and count to find or start the record of a stage
+        :param name: stage name
+        :return: record: the counters of the stage
+        """
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = {"calls": 0, "items": 0, "bytes": 0, "hits": 0, "misses": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0}
+        return record
+
+
+class NavigatorURLStopOrder:
+    """
+    generic class for an optional pre-pass over the stops of a route: stops closer than a tolerance are collapsed into one,
+    then the stops are ordered by nearest neighbour from the start and improved with 2-opt. distances are great circle
+    (haversine) computed with numpy, as a full matrix for routes up to matrixLimit stops and row by row above it.
+    routes with an address stop are left as they are, there is no coordinate to order them by
+    """
+    __earthRadius = 6371008.8  # mean earth radius in meters
+
+    def __init__(self, collapseMeters=10.0, twoOpt=True, maxPasses=20, matrixLimit=2048):
+        """
+        constructor for the stop order, shareable across NavigatorURLScheme objects
+        :param collapseMeters: optional distance under which a stop is merged into an earlier one (keeping the earlier name), None keeps all
+        :param twoOpt: optional boolean, False keeps the nearest neighbour order
+        :param maxPasses: optional largest number of 2-opt passes over a route
+        :param matrixLimit: optional largest number of points with a full distance matrix (the matrix takes 8 * n * n bytes)
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("Ordering stops requires numpy (pip install numpy)")
+        self.__numpy = numpy
+        self.__collapseMeters = collapseMeters
+        self.__twoOpt = twoOpt
+        self.__maxPasses = maxPasses
+        self.__matrixLimit = matrixLimit
+        self.orderedRoutes, self.collapsedStops = 0, 0
+
+    def ordered(self, parameterDictionary):
+        """
+        applies the pre-pass to the stops of a route
+        :param parameterDictionary: the dictionary of key/value pairs to be used when building url, see NavigatorURLScheme
+        :return: parameterDictionary: a copy with the stops collapsed and ordered, or the same dictionary when there is nothing to order
+        """
+        stops, start = parameterDictionary.get("stops", None), parameterDictionary.get("start", None)
+        if not stops or len(stops) < 2: return parameterDictionary
+        points = [self._coordinate(stop) for stop in stops]
+        if None in points: return parameterDictionary
+        startPoint = self._coordinate(start) if start else None
+        numpy = self.__numpy
+        latitudes, longitudes = numpy.radians(numpy.array(points, dtype=float)).T
+        kept = self._collapsed(latitudes, longitudes)
+        self.collapsedStops += len(stops) - len(kept)
+        if startPoint is not None:
+            # the start is point 0 of the tour and stays first
+            start = numpy.radians(numpy.array(startPoint, dtype=float))
+            latitudes, longitudes = numpy.concatenate(([start[0]], latitudes[kept])), numpy.concatenate(([start[1]], longitudes[kept]))
+            tour = self._tour(latitudes, longitudes)[1:] - 1
+        else:
+            tour = self._tour(latitudes[kept], longitudes[kept])
+        self.orderedRoutes += 1
+        return dict(parameterDictionary, stops=[stops[kept[index]] for index in tour])
+
+    def orderMany(self, parameterDictionaries):
+        """
+        generator applying the pre-pass to many routes
+        :param parameterDictionaries: iterable of parameter dictionaries
+        :return: yields the ordered parameter dictionary of each route in order
+        """
+        for parameterDictionary in parameterDictionaries: yield self.ordered(parameterDictionary)
+
+    def _coordinate(self, location):
+        """
+        supporting function of ordered to read a 'lat,lon' location
+        :param location: stop or start list i.e. ['43.222,-76.444', 'esri']
+        :return: (lat, lon) in degrees or None for an address
+        """
+        return _coordinate(location[0])
+
+    def _distanceFunction(self, latitudes, longitudes):
+        """
+        supporting function of ordered for vectorized haversine distances between the points of a route.
+        up to matrixLimit points the full matrix is computed once, above it distances are computed on demand from unit
+        vectors (the haversine of the central angle is a quarter of the squared chord between them)
+        :param latitudes: numpy array of latitudes in radians
+        :param longitudes: numpy array of longitudes in radians
+        :return: distance: function of a point index and an index array (or slice) returning the distances in meters
+        """
+        numpy = self.__numpy
+        if len(latitudes) <= self.__matrixLimit:
+            haversines = (numpy.sin((latitudes[:, None] - latitudes[None, :]) / 2) ** 2 + numpy.cos(latitudes[:, None]) *
+                          numpy.cos(latitudes[None, :]) * numpy.sin((longitudes[:, None] - longitudes[None, :]) / 2) ** 2)
+            matrix = 2 * self.__earthRadius * numpy.arcsin(numpy.sqrt(numpy.minimum(haversines, 1.0)))
+            return lambda index, points: matrix[index, points]
+        vectors = numpy.stack((numpy.cos(latitudes) * numpy.cos(longitudes), numpy.cos(latitudes) * numpy.sin(longitudes), numpy.sin(latitudes)), 1)
+
+        def distance(index, points):
+            chords = vectors[points] - vectors[index]
+            return 2 * self.__earthRadius * numpy.arcsin(numpy.minimum(numpy.sqrt(numpy.einsum("ij,ij->i", chords, chords)) / 2, 1.0))
+        return distance
+
+    def _collapsed(self, latitudes, longitudes):
+        """
+        supporting function of ordered to merge each stop into the first earlier stop within collapseMeters
+        :return: kept: indices of the stops kept, in their original order
+        """
+        numpy = self.__numpy
+        if not self.__collapseMeters: return numpy.arange(len(latitudes))
+        distance = self._distanceFunction(latitudes, longitudes)
+        merged = numpy.zeros(len(latitudes), dtype=bool)
+        for index in range(len(latitudes) - 1):
+            if merged[index]: continue
+            merged[index + 1:] |= distance(index, slice(index + 1, None)) <= self.__collapseMeters
+        return numpy.flatnonzero(~merged)
+
+    def _tour(self, latitudes, longitudes):
+        """
+        supporting function of ordered to order points from point 0 by nearest neighbour, then improve the open path with 2-opt
+        :return: tour: numpy array of point indices starting with 0
+        """
+        numpy = self.__numpy
+        distance = self._distanceFunction(latitudes, longitudes)
+        remaining = numpy.arange(1, len(latitudes))
+        tour = [0]
+        while len(remaining):
+            nearest = int(numpy.argmin(distance(tour[-1], remaining)))
+            tour.append(int(remaining[nearest]))
+            remaining = numpy.delete(remaining, nearest)
+        tour = numpy.array(tour, dtype=numpy.intp)
+        if self.__twoOpt and len(tour) > 3: self._twoOpt(tour, distance)
+        return tour
+
+    def _twoOpt(self, tour, distance):
+        """
+        supporting function of _tour to shorten the open path in place by reversing segments, point 0 stays first.
+        for each edge (a, b) every later edge (c, d) is scored at once and the best reversal of b..c is applied.
+        points whose edges did not change since they last failed to improve are skipped (don't-look bits)
+        :param tour: numpy array of point indices
+        :param distance: function returned by _distanceFunction
+        """
+        numpy = self.__numpy
+        count = len(tour)
+        edges = numpy.array([distance(tour[position], tour[position + 1:position + 2])[0] for position in range(count - 1)])
+        look = numpy.ones(count, dtype=bool)  # by point
+        for _ in range(self.__maxPasses):
+            improved = False
+            for first in range(count - 2):
+                a, b = tour[first], tour[first + 1]
+                if not look[a]: continue
+                # reversing tour[first + 1:last + 1] replaces edges (a, b), (c, d) with (a, c), (b, d)
+                gains = distance(a, tour[first + 2:]) - edges[first]
+                gains[:-1] += distance(b, tour[first + 3:]) - edges[first + 2:]  # the last point has no edge after it
+                best = int(numpy.argmin(gains))
+                if gains[best] >= -1e-6:
+                    look[a] = False
+                    continue
+                last = first + 2 + best
+                look[tour[[first + 1, last, min(last + 1, count - 1)]]] = True  # a stays on, b, c and d changed edges
+                tour[first + 1:last + 1] = tour[first + 1:last + 1][::-1].copy()
+                edges[first + 1:last] = edges[first + 1:last][::-1].copy()
+                edges[first] = distance(a, tour[first + 1:first + 2])[0]
+                if last < count - 1: edges[last] = distance(tour[last], tour[last + 1:last + 2])[0]
+                improved = True
+            if not improved: break
+
+
+class NavigatorURLStops:
+    """
+    generic class for a compact list of coordinate stops: latitudes and longitudes in contiguous double arrays and names
+    interned in a table, about 20 bytes per stop instead of two strings and a list. it can be passed as the "stops"
+    of a parameter dictionary and behaves like the usual list of [location, name] lists. coordinates are written to
+    the url with a fixed number of decimals (trailing zeros dropped) instead of the full float repr
+    """
+    def __init__(self, precision=6):
+        """
+        constructor for an empty stop list
+        :param precision: optional number of decimals written per coordinate (6 decimals is about 0.1 m)
+        """
+        self.latitudes = array.array('d')
+        self.longitudes = array.array('d')
+        self.nameIndices = array.array('i')  # index into names, -1 for a stop without name
+        self.names = []
+        self.precision = precision
+        self.__nameTable = {}
+        self.__namesShared = False  # names and the name table are shared with a slice, copied before a new name is added
+
+    @classmethod
+    def fromLists(cls, stops, precision=6):
+        """
+        builds the compact list from the usual stops
+        :param stops: [['43.222,-76.444','esri'], ['43.681959,-70.092359'], ...] or (latitude, longitude, name) tuples
+        :param precision: optional number of decimals written per coordinate
+        :return: stops: NavigatorURLStops
+        """
+        compactStops = cls(precision)
+        for stop in stops:
+            if isinstance(stop[0], str):
+                latitude, separator, longitude = stop[0].partition(",")
+                try: compactStops.append(float(latitude), float(longitude), stop[1] if len(stop) > 1 else None)
+                except ValueError: raise ValueError("NavigatorURLStops only holds coordinate stops: " + str(stop[0]))
+            else: compactStops.append(stop[0], stop[1], stop[2] if len(stop) > 2 else None)
+        return compactStops
+
+    def append(self, latitude, longitude, name=None):
+        """
+        adds a stop
+        :param latitude: latitude in degrees
+        :param longitude: longitude in degrees
+        :param name: optional name of the stop, repeated names are stored once
+        """
+        self.latitudes.append(latitude)
+        self.longitudes.append(longitude)
+        if name is None or name == "":
+            self.nameIndices.append(-1)
+            return
+        nameIndex = self.__nameTable.get(name)
+        if nameIndex is None:
+            if self.__namesShared: self.names, self.__nameTable, self.__namesShared = list(self.names), dict(self.__nameTable), False
+            nameIndex = self.__nameTable[name] = len(self.names)
+            self.names.append(str(name))
+        self.nameIndices.append(nameIndex)
+
+    def formattedLocations(self):
+        """
+        writes every coordinate pair with the fixed precision in one pass
+        :return: locations: list of 'lat,lon' strings
+        """
+        formatted = ("{:." + str(self.precision) + "f}").format
+        trimmed = self._trimmed
+        return [trimmed(formatted(latitude)) + "," + trimmed(formatted(longitude)) for latitude, longitude in zip(self.latitudes, self.longitudes)]
+
+    def encodedFragments(self, quote=_quote, locationType="stop=", nameType="stopname="):
+        """
+        supporting function of NavigatorURLScheme._encodedLocations to encode all stops at once, each name is quoted once
+        :param quote: optional function quoting a name, i.e. the quote of a NavigatorURLEncodingCache
+        :param locationType: optional parameter of the locations
+        :param nameType: optional parameter of the names
+        :return: fragments: list of encoded parameters [param=value, param=value, ...]
+        """
+        fragments, encodedNames = [], {}
+        for location, nameIndex in zip(self.formattedLocations(), self.nameIndices):
+            fragments.append(locationType + location)  # digits, '.', '-' and ',' need no quoting
+            if nameIndex >= 0:
+                encodedName = encodedNames.get(nameIndex)
+                if encodedName is None: encodedName = encodedNames[nameIndex] = nameType + quote(self.names[nameIndex])
+                fragments.append(encodedName)
+        return fragments
+
+    def _trimmed(self, formatted):
+        """
+        supporting function of formattedLocations to drop the trailing zeros (and sign of zero) of a formatted coordinate
+        :param formatted: coordinate written with the fixed precision
+        :return: the coordinate string
+        """
+        if self.precision > 0: formatted = formatted.rstrip("0").rstrip(".")
+        return formatted if formatted != "-0" else "0"
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def __getitem__(self, index):
+        """
+        a stop as [location, name] list (or [location] without name), or a NavigatorURLStops for a slice
+        """
+        if isinstance(index, slice):
+            compactStops = NavigatorURLStops(self.precision)
+            compactStops.latitudes, compactStops.longitudes = self.latitudes[index], self.longitudes[index]
+            compactStops.nameIndices = self.nameIndices[index]
+            compactStops.names, compactStops.__nameTable = self.names, self.__nameTable
+            compactStops.__namesShared = self.__namesShared = True
+            return compactStops
+        formatted = ("{:." + str(self.precision) + "f}").format
+        location = self._trimmed(formatted(self.latitudes[index])) + "," + self._trimmed(formatted(self.longitudes[index]))
+        nameIndex = self.nameIndices[index]
+        return [location, self.names[nameIndex]] if nameIndex >= 0 else [location]
+
+    def __iter__(self):
+        for index in range(len(self.latitudes)): yield self[index]
+
+
+def _addressKey(address):
+    """
+    supporting function of the address cache and geocoders to compare addresses regardless of case and spacing
+    :param address: address string
+    :return: the normalized address i.e. '100 commercial st, portland, me, 04101'
+    """
+    return re.sub(r"\s*,\s*", ", ", " ".join(str(address).lower().split()))
+
+
+class NavigatorURLCSVGeocoder:
+    """
+    generic geocoder looking addresses up in a local csv table of address, latitude and longitude columns, a stand-in for a
+    geocoding service. any object with a geocodeMany(addresses) function can be used by NavigatorURLAddressCache
+    """
+    def __init__(self, csvLocation, addressColumn="address", latitudeColumn="latitude", longitudeColumn="longitude", delimiter=','):
+        """
+        constructor for the csv geocoder, reads the whole table
+        :param csvLocation: full path to csv file with a header row
+        :param addressColumn: optional header of the address column
+        :param latitudeColumn: optional header of the latitude column
+        :param longitudeColumn: optional header of the longitude column
+        :param delimiter: optional csv delimiter
+        """
+        import csv
+        self.__table = {}
+        with open(csvLocation, newline='') as csvFile:
+            for row in csv.DictReader(csvFile, delimiter=delimiter):
+                self.__table[_addressKey(row[addressColumn])] = (float(row[latitudeColumn]), float(row[longitudeColumn]))
+        self.requests = 0  # number of geocodeMany calls
+
+    def geocodeMany(self, addresses):
+        """
+        geocodes a batch of addresses
+        :param addresses: list of address strings
+        :return: {address: (latitude, longitude)} for the addresses found, the others are left out
+        """
+        self.requests += 1
+        found = {}
+        for address in addresses:
+            coordinate = self.__table.get(_addressKey(address), None)
+            if coordinate is not None: found[address] = coordinate
+        return found
+
+
+class NavigatorURLAddressCache:
+    """
+    generic class for an optional pre-pass replacing the address locations of a route with 'lat,lon' coordinates, which
+    quote to far fewer characters and so shorten urls and QR codes. resolved addresses are kept in a persistent sqlite
+    cache, including the ones the geocoder could not find so they are not asked again, and the cache misses of a batch
+    of routes are sent to the geocoder in a single call. names are kept, addresses nobody could resolve stay as they are
+    """
+    __lookupChunk = 500  # addresses per sqlite query, below the limit on query parameters
+
+    def __init__(self, cacheLocation, geocoder=None, precision=6, batchSize=1000):
+        """
+        constructor for the address cache, shareable across NavigatorURLScheme objects
+        :param cacheLocation: full path to the sqlite cache file (created if missing), ':memory:' for a cache of this run only
+        :param geocoder: optional object with geocodeMany(addresses) returning {address: (latitude, longitude)} i.e.
+                         NavigatorURLCSVGeocoder, None only resolves the addresses already cached
+        :param precision: optional number of decimals of the coordinates (6 is about 0.1 m)
+        :param batchSize: optional number of routes of resolveMany whose cache misses go to the geocoder together
+        """
+        import sqlite3
+        self.__connection = sqlite3.connect(str(cacheLocation))
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS addresses (address TEXT PRIMARY KEY, latitude REAL, longitude REAL)")
+        self.__geocoder = geocoder
+        self.__formatter = NavigatorURLStops(precision)
+        self.__batchSize = batchSize
+        self.__coordinates = {}  # address key -> (latitude, longitude) or None, looked up in this run
+        self.hits, self.misses, self.notFound = 0, 0, 0  # distinct addresses found in the cache, sent to the geocoder, not resolved
+
+    def resolved(self, parameterDictionary):
+        """
+        applies the pre-pass to the start and stops of a route
+        :param parameterDictionary: the dictionary of key/value pairs to be used when building url, see NavigatorURLScheme
+        :return: parameterDictionary: a copy with the known addresses replaced, or the same dictionary when it has no address
+        """
+        for resolvedDictionary in self.resolveMany([parameterDictionary]): return resolvedDictionary
+
+    def resolveMany(self, parameterDictionaries):
+        """
+        generator applying the pre-pass to many routes, looking up the addresses of batchSize routes at a time
+        :param parameterDictionaries: iterable of parameter dictionaries
+        :return: yields the resolved parameter dictionary of each route in order
+        """
+        batch = []
+        for parameterDictionary in parameterDictionaries:
+            batch.append(parameterDictionary)
+            if len(batch) >= self.__batchSize:
+                for resolvedDictionary in self._resolvedBatch(batch): yield resolvedDictionary
+                batch = []
+        for resolvedDictionary in self._resolvedBatch(batch): yield resolvedDictionary
+
+    def close(self):
+        """
+        closes the sqlite cache
+        """
+        self.__connection.close()
+
+    def _addresses(self, parameterDictionary):
+        """
+        supporting function of _resolvedBatch for the address locations of a route
+        :return: list of the address strings of the start and stops
+        """
+        start, stops = parameterDictionary.get("start", None), parameterDictionary.get("stops", None)
+        locations = ([start] if start else []) + (list(stops) if stops and not isinstance(stops, NavigatorURLStops) else [])
+        return [str(location[0]) for location in locations if _coordinate(location[0]) is None]
+
+    def _resolvedBatch(self, parameterDictionaries):
+        """
+        supporting function of resolveMany to look up the addresses of a batch of routes (cache first, then one geocoder
+        call for the misses) and replace them
+        :param parameterDictionaries: list of parameter dictionaries
+        :return: list of the resolved parameter dictionaries
+        """
+        unknown = {}  # address key -> address, not looked up in this run yet
+        for parameterDictionary in parameterDictionaries:
+            for address in self._addresses(parameterDictionary):
+                key = _addressKey(address)
+                if key not in self.__coordinates: unknown.setdefault(key, address)
+        if unknown:
+            keys = list(unknown)
+            for first in range(0, len(keys), self.__lookupChunk):
+                chunk = keys[first:first + self.__lookupChunk]
+                query = "SELECT address, latitude, longitude FROM addresses WHERE address IN (" + ",".join("?" * len(chunk)) + ")"
+                for key, latitude, longitude in self.__connection.execute(query, chunk):
+                    self.__coordinates[key] = (latitude, longitude) if latitude is not None else None
+                    del unknown[key]
+            self.hits += len(keys) - len(unknown)
+            if unknown and self.__geocoder is not None:
+                self.misses += len(unknown)
+                found = dict((_addressKey(address), coordinate) for address, coordinate in self.__geocoder.geocodeMany(list(unknown.values())).items())
+                rows = [(key, found[key][0], found[key][1]) if key in found else (key, None, None) for key in unknown]
+                with self.__connection: self.__connection.executemany("INSERT OR REPLACE INTO addresses VALUES (?, ?, ?)", rows)
+                for key, latitude, longitude in rows:
+                    self.__coordinates[key] = (latitude, longitude) if latitude is not None else None
+                    if latitude is None: self.notFound += 1
+        return [self._replaced(parameterDictionary) for parameterDictionary in parameterDictionaries]
+
+    def _replaced(self, parameterDictionary):
+        """
+        supporting function of _resolvedBatch to replace the resolved addresses of a route
+        :return: parameterDictionary: a copy with the resolved addresses replaced, or the same dictionary without any address
+        """
+        if not self._addresses(parameterDictionary): return parameterDictionary
+        formatter = self.__formatter
+
+        def location(listLocation):
+            if _coordinate(listLocation[0]) is not None: return listLocation
+            coordinate = self.__coordinates.get(_addressKey(listLocation[0]), None)
+            if coordinate is None: return listLocation
+            formatted = "{:.{}f}".format(coordinate[0], formatter.precision), "{:.{}f}".format(coordinate[1], formatter.precision)
+            return [formatter._trimmed(formatted[0]) + "," + formatter._trimmed(formatted[1])] + list(listLocation[1:])
+        resolvedDictionary = dict(parameterDictionary)
+        if parameterDictionary.get("start", None): resolvedDictionary["start"] = location(parameterDictionary["start"])
+        stops = parameterDictionary.get("stops", None)
+        if stops and not isinstance(stops, NavigatorURLStops): resolvedDictionary["stops"] = [location(stop) for stop in stops]
+        return resolvedDictionary
+
+
 class NavigatorURLScheme:
     """
     generic library for generating the url schemes
@@ -34,134 +609,398 @@ class NavigatorURLScheme:
     __navigatorScheme = "arcgis-navigator://"
     __validParameters = ["start", "startname", "stop", "stopname", "optimize", "travelmode", "navigate", "callbackprompt", "callback"]
     __invalidStringCharacters = [" ", "&"]
-    __parameterCount = 0  # counter for how many parameters have been passed to stringBuilder
+    __unencodedCharacters = re.compile(r"[^A-Za-z0-9_.~,'+%-]|%(?![0-9A-Fa-f]{2})")  # anything quote_plus would have encoded
+    __parameterOwners = {"stopname": "stop", "startname": "start", "callbackprompt": "callback"}  # parameters that name the one before
+    __travelModes = {
+        "drivingtime": "Driving+Time",
+        "drivingdistance": "Driving+Distance",
+        "truckingtime": "Trucking+Time",
+        "truckingdistance": "Trucking+Distance",
+        "walkingtime": "Walking+Time",
+        "walkingdistance": "Walking+Distance",
+        "ruraldrivingtime": "Rural+Driving+Time",
+        "ruraldrivingdistance": "Rural+Driving+Distance",
+    }  # travel modes keyed by their normalized name, values already quoted for the url
+    __batchCacheItems = 4096  # values quoted once per batch of generateMany/generateManyLinks without an encodingCache
+    __batchCacheProbe = 256  # routes after which a batch cache with fewer than a quarter of hits is dropped
 
-    def __init__(self, parameterDictionary):
+    def __init__(self, parameterDictionary, encodingCache=None, stats=None, stopOrder=None, addressCache=None):
         """
         constructor for the NavigatorURLScheme library
         :param parameterDictionary: the dictionary of key/value pairs to be used when building url
+        :param encodingCache: optional NavigatorURLEncodingCache shared with other NavigatorURLScheme objects
+        :param stats: optional NavigatorURLStats recording the generateURL and validateURL stages
+        :param stopOrder: optional NavigatorURLStopOrder collapsing and ordering coordinate stops before the url is built
+        :param addressCache: optional NavigatorURLAddressCache replacing known addresses with coordinates (before stopOrder)
+        """
+        self.__addressCache = addressCache
+        self.__stopOrder = stopOrder
+        self._loadParameters(parameterDictionary)
+        self._useEncodingCache(encodingCache)
+        self.__stats = stats
+
+    def _useEncodingCache(self, encodingCache=None):
+        """
+        supporting function of the constructor and generateMany to pick how locations, names and prompts are quoted
+        :param encodingCache: optional NavigatorURLEncodingCache, None quotes every value again
+        """
+        self.__encodingCache = encodingCache
+        self.__quote = encodingCache.quote if encodingCache is not None else _quote
+
+    def _useBatchCache(self, batchCache, count):
+        """
+        supporting function of generateMany and generateManyLinks to quote the values directly again once the first
+        routes of a batch show they hardly repeat, a cache miss costs more than quoting
+        :param batchCache: the NavigatorURLEncodingCache of the batch, None when the caller passed one
+        :param count: number of routes built so far
+        """
+        if count != self.__batchCacheProbe or batchCache is None: return
+        stats = batchCache.stats()
+        if stats["hits"] * 4 < stats["hits"] + stats["misses"]: self._useEncodingCache(None)
+
+    def _loadParameters(self, parameterDictionary):
+        """
+        supporting function of the constructor and generateMany to (re)load the parameters used when building url
+        :param parameterDictionary: the dictionary of key/value pairs to be used when building url
         """
+        if self.__addressCache is not None: parameterDictionary = self.__addressCache.resolved(parameterDictionary)
+        if self.__stopOrder is not None: parameterDictionary = self.__stopOrder.ordered(parameterDictionary)
         self.__parameterDictionary = parameterDictionary
-        self.__stops = self.__parameterDictionary.get("stops", None)
-        self.__start = self.__parameterDictionary.get("start", None)
-        self.__optimize = str(self.__parameterDictionary.get("optimize", None)).lower().replace(" ", "") \
-            if self.__parameterDictionary.get("optimize", None) is not None else None
-        self.__navigate = str(self.__parameterDictionary.get("navigate", None)).lower().replace(" ", "") \
-            if self.__parameterDictionary.get("navigate", None) is not None else None
-        self.__travelMode = self.__parameterDictionary.get("travelmode", None)
-        self.__callback = self.__parameterDictionary.get("callback", None) \
-            if self.__parameterDictionary.get("callback", None) is not None else None
-
-    def generateURL(self):
-        """
-        function to generate the URL string
-        :return: stringBuilder: the validated url
-        """
-        stringBuilder = self.__navigatorScheme + "?"
-        if self._encodedLocations(self.__stops):
-            stringBuilder += self._encodedLocations(self.__stops)
-            self.__parameterCount += 1
-        if self._encodedLocations(self.__start, isStop=False):
-            stringBuilder += self._encodedLocations(self.__start, isStop=False)
-            self.__parameterCount += 1
-        if self.__optimize:
-            if self.__parameterCount > 0: stringBuilder += "&"
-            stringBuilder += "optimize=" + self.__optimize
-            self.__parameterCount += 1
-        if self.__navigate:
-            if self.__parameterCount > 0: stringBuilder += "&"
-            stringBuilder += "navigate=" + self.__navigate
-            self.__parameterCount += 1
-        if self._encodedTravelMode(self.__travelMode):
-            stringBuilder += "travelmode=" + self._encodedTravelMode(self.__travelMode)
-            self.__parameterCount += 1
-        if self.__callback:
-            if self.__parameterCount > 0: stringBuilder += "&"
-            stringBuilder += self._encodedCallback(self.__callback)
-            self.__parameterCount += 1
-        self._validateURL(stringBuilder)
-        return stringBuilder
+        self.__stops = parameterDictionary.get("stops", None)
+        self.__start = parameterDictionary.get("start", None)
+        optimize = parameterDictionary.get("optimize", None)
+        self.__optimize = str(optimize).lower().replace(" ", "") if optimize is not None else None
+        navigate = parameterDictionary.get("navigate", None)
+        self.__navigate = str(navigate).lower().replace(" ", "") if navigate is not None else None
+        self.__travelMode = parameterDictionary.get("travelmode", None)
+        self.__callback = parameterDictionary.get("callback", None)
+
+    @classmethod
+    def generateMany(cls, parameterDictionaries, validate=True, encodingCache=None, stats=None, stopOrder=None, addressCache=None):
+        """
+        generator to build urls for many parameter dictionaries, sharing one builder across the whole batch. without an
+        encodingCache the values repeating across the routes (depots, names, prompts) are quoted once per batch, unless
+        the first routes show they hardly repeat
+        :param parameterDictionaries: iterable of parameter dictionaries, see constructor
+        :param validate: optional boolean to validate each generated url
+        :param encodingCache: optional NavigatorURLEncodingCache, worth it when locations and names repeat across batches
+        :param stats: optional NavigatorURLStats, also records the hits of the encodingCache passed in
+        :param stopOrder: optional NavigatorURLStopOrder applied to every route
+        :param addressCache: optional NavigatorURLAddressCache, the addresses of each batch of routes are looked up together
+        :return: yields the url for each parameter dictionary in order
+        """
+        builder = cls.__new__(cls)
+        batchCache = NavigatorURLEncodingCache(cls.__batchCacheItems) if encodingCache is None else None
+        builder._useEncodingCache(encodingCache if batchCache is None else batchCache)
+        builder.__stats = stats
+        builder.__stopOrder = stopOrder
+        builder.__addressCache = None
+        if addressCache is not None: parameterDictionaries = addressCache.resolveMany(parameterDictionaries)
+        cacheStats = encodingCache.stats() if stats is not None and encodingCache is not None else None
+        for count, parameterDictionary in enumerate(parameterDictionaries, 1):
+            builder._loadParameters(parameterDictionary)
+            yield builder.generateURL(validate)
+            builder._useBatchCache(batchCache, count)
+        if cacheStats is not None:
+            batchStats = encodingCache.stats()
+            stats.count("encodingCache", hits=batchStats["hits"] - cacheStats["hits"], misses=batchStats["misses"] - cacheStats["misses"])
+
+    @classmethod
+    def generateManyLinks(cls, parameterDictionaries, schemes=None, validate=True, encodingCache=None, stats=None, stopOrder=None,
+                          addressCache=None):
+        """
+        generator to build the links of many routes for several app schemes, sharing one builder across the whole batch
+        :param parameterDictionaries: iterable of parameter dictionaries, see constructor
+        :param schemes: optional list of scheme names, see generateLinks
+        :param validate: optional boolean to validate each link
+        :param encodingCache: optional NavigatorURLEncodingCache
+        :param stats: optional NavigatorURLStats
+        :param stopOrder: optional NavigatorURLStopOrder applied to every route
+        :param addressCache: optional NavigatorURLAddressCache, see generateMany
+        :return: yields the {schemeName: url} of each parameter dictionary in order
+        """
+        builder = cls.__new__(cls)
+        batchCache = NavigatorURLEncodingCache(cls.__batchCacheItems) if encodingCache is None else None
+        builder._useEncodingCache(encodingCache if batchCache is None else batchCache)
+        builder.__stats = stats
+        builder.__stopOrder = stopOrder
+        builder.__addressCache = None
+        if addressCache is not None: parameterDictionaries = addressCache.resolveMany(parameterDictionaries)
+        for count, parameterDictionary in enumerate(parameterDictionaries, 1):
+            builder._loadParameters(parameterDictionary)
+            yield builder.generateLinks(schemes, validate)
+            builder._useBatchCache(batchCache, count)
+
+    @classmethod
+    def parse(cls, url, strict=True):
+        """
+        function to decode a url back into its parameter dictionary, the inverse of generateURL:
+        NavigatorURLScheme(NavigatorURLScheme.parse(url)).generateURL() == url for every url generateURL builds
+        :param url: navigator url string i.e. 'arcgis-navigator://?stop=43.222,-76.444&stopname=esri'
+        :param strict: optional boolean, False skips unknown parameters instead of raising
+        :return: parameterDictionary: {"start": [...], "stops": [[...], ...], "optimize": ..., "navigate": ...,
+                 "travelmode": ..., "callback": [...]} with only the parameters found in the url
+        """
+        applicationScheme, _, parameterString = url.partition("?")
+        if applicationScheme != cls.__navigatorScheme: raise ValueError("The application scheme is not valid for Navigator")
+        parameterDictionary, stops, start, callback = {}, [], None, None
+        for parameter in parameterString.split("&"):
+            if not parameter: continue
+            parameterKey, _, parameterValue = parameter.partition("=")  # values may contain "="
+            # generateURL writes the callback scheme as it is, so it is kept raw as well
+            if ("+" in parameterValue or "%" in parameterValue) and parameterKey != "callback":
+                parameterValue = urllib.parse.unquote_plus(parameterValue)
+            if parameterKey == "stop": stops.append([parameterValue])
+            elif parameterKey == "stopname" and stops and len(stops[-1]) == 1: stops[-1].append(parameterValue)
+            elif parameterKey == "start" and start is None: start = [parameterValue]
+            elif parameterKey == "startname" and start is not None and len(start) == 1: start.append(parameterValue)
+            elif parameterKey == "callback" and callback is None: callback = [parameterValue]
+            elif parameterKey == "callbackprompt" and callback is not None and len(callback) == 1: callback.append(parameterValue)
+            elif parameterKey in ("optimize", "navigate", "travelmode") and parameterKey not in parameterDictionary:
+                parameterDictionary[parameterKey] = parameterValue
+            elif strict and parameterKey not in cls.__validParameters: raise ValueError("Invalid parameter key entered: " + parameterKey)
+            elif strict: raise ValueError("Unexpected parameter entered: " + parameter)
+        if stops: parameterDictionary["stops"] = stops
+        if start is not None: parameterDictionary["start"] = start
+        if callback is not None: parameterDictionary["callback"] = callback
+        return parameterDictionary
+
+    @classmethod
+    def parseMany(cls, urls, strict=True, stats=None):
+        """
+        generator to decode many urls, i.e. the lines of an access log
+        :param urls: iterable of navigator url strings (surrounding whitespace is ignored)
+        :param strict: optional boolean, False skips unknown parameters instead of raising
+        :param stats: optional NavigatorURLStats recording the parse stage
+        :return: yields the parameter dictionary of each url in order
+        """
+        if stats is None:
+            for url in urls: yield cls.parse(url.strip(), strict)
+            return
+        for url in urls:
+            with stats.stage("parse"): parameterDictionary = cls.parse(url.strip(), strict)
+            yield parameterDictionary
+
+    def generateURL(self, validate=True):
+        """
+        function to generate the URL string. each field is encoded once and the query is joined in a single pass,
+        without touching instance state, so the same object can be called repeatedly and from many threads
+        :param validate: optional boolean to validate the raw (unencoded) values while building
+        :return: the validated url
+        """
+        if self.__stats is None: return self._generatedURL(validate)
+        with self.__stats.stage("generateURL"): url = self._generatedURL(validate)
+        self.__stats.count("generateURL", bytesWritten=len(url))
+        return url
+
+    def _generatedURL(self, validate=True):
+        """
+        supporting function of generateURL to encode and join the parameters
+        :param validate: optional boolean to validate the raw (unencoded) values while building
+        :return: the validated url
+        """
+        parameters = self._encodedLocations(self.__stops)
+        parameters += self._encodedLocations(self.__start, isStop=False)
+        if self.__optimize: parameters.append("optimize=" + self._validatedValue(self.__optimize, validate))
+        if self.__navigate: parameters.append("navigate=" + self._validatedValue(self.__navigate, validate))
+        travelMode = self._encodedTravelMode(self.__travelMode)
+        if travelMode: parameters.append("travelmode=" + travelMode)
+        if self.__callback: parameters += self._encodedCallback(self.__callback, validate)
+        return self.__navigatorScheme + "?" + "&".join(parameters)
+
+    def generateLinks(self, schemes=None, validate=True):
+        """
+        function to generate the links of the route for several app schemes in one pass: the locations, names and prompt
+        are normalized and quoted once, then every scheme of NavigatorURLSchemeRegistry builds its link from them with
+        its own validation
+        :param schemes: optional list of scheme names i.e. ["navigator", "googlemaps"], None for every registered scheme
+                        that applies to the route (i.e. "collector" only with an 'itemid' and a 'lat,lon' stop), a scheme
+                        named explicitly raises ValueError for a route it cannot open
+        :param validate: optional boolean to validate the values of each link
+        :return: links: {schemeName: url} in the order of schemes, the "navigator" link is the url of generateURL
+        """
+        if self.__stats is None: route = self._normalizedRoute()
+        else:
+            with self.__stats.stage("normalizeRoute"): route = self._normalizedRoute()
+        links = collections.OrderedDict()
+        for name in NavigatorURLSchemeRegistry.applicableNames(route) if schemes is None else schemes:
+            buildLink = NavigatorURLSchemeRegistry.buildLink(name)
+            if self.__stats is None: links[name] = buildLink(route, validate)
+            else:
+                with self.__stats.stage(name + "Link"): links[name] = buildLink(route, validate)
+        return links
+
+    def _normalizedRoute(self):
+        """
+        supporting function of generateLinks to quote the locations, names and prompt of the route once for every scheme
+        :return: route: {"start": _RouteLocation or None, "stops": [_RouteLocation, ...], "optimize", "navigate" (normalized
+                 strings or None), "travelMode": normalized travel mode i.e. "walkingtime" or None, "callback": [scheme,
+                 encodedPrompt or None] or None, "parameters": the parameter dictionary (for scheme specific keys)}
+        """
+        quote = self.__quote
+
+        def routeLocation(listLocation):
+            location = str(listLocation[0])
+            encodedName = quote(str(listLocation[1])) if len(listLocation) > 1 and listLocation[1] is not None else None
+            return _RouteLocation(location, quote(location), encodedName, _coordinate(location))
+        callback = None
+        if self.__callback: callback = [str(self.__callback[0]), quote(str(self.__callback[1])) if len(self.__callback) > 1 else None]
+        return {"start": routeLocation(self.__start) if self.__start else None,
+                "stops": [routeLocation(stop) for stop in self.__stops] if self.__stops else [],
+                "optimize": self.__optimize, "navigate": self.__navigate,
+                "travelMode": str(self.__travelMode).lower().replace(" ", "") if self.__travelMode is not None else None,
+                "callback": callback, "parameters": self.__parameterDictionary}
+
+    @classmethod
+    def _navigatorLink(cls, route, validate=True):
+        """
+        supporting function of generateLinks building the navigator link of a normalized route, registered as "navigator"
+        :param route: normalized route, see _normalizedRoute
+        :param validate: optional boolean to check the values that are not quoted
+        :return: the url, the same generateURL builds
+        """
+        def validated(value):
+            if validate:
+                for char in cls.__invalidStringCharacters:
+                    if char in value: raise ValueError("Invalid encoded value entered: " + value)
+            return value
+        parameters = []
+        for locations, locationType, locationNameType in ((route["stops"], "stop=", "stopname="), ([route["start"]] if route["start"] else [], "start=", "startname=")):
+            for location in locations:
+                parameters.append(locationType + location.encodedLocation)
+                if location.encodedName is not None: parameters.append(locationNameType + location.encodedName)
+        if route["optimize"]: parameters.append("optimize=" + validated(route["optimize"]))
+        if route["navigate"]: parameters.append("navigate=" + validated(route["navigate"]))
+        travelMode = cls.__travelModes.get(route["travelMode"], None)
+        if travelMode: parameters.append("travelmode=" + travelMode)
+        if route["callback"]:
+            parameters.append("callback=" + validated(route["callback"][0]))
+            if route["callback"][1] is not None: parameters.append("callbackprompt=" + route["callback"][1])
+        return cls.__navigatorScheme + "?" + "&".join(parameters)
+
+    def generateLegs(self, maxLength, validate=True):
+        """
+        function to split the route into consecutive legs whose urls are at most maxLength characters.
+        stops are taken greedily in order, every leg after the first starts at the last stop of the one before it
+        and keeps the other parameters (optimize, travelmode, callback, ...)
+        :param maxLength: maximum length of each url i.e. NavigatorURLQRCode().qrCapacity()
+        :param validate: optional boolean to validate the raw (unencoded) values while building
+        :return: legs: list of urls, a single url when the whole route fits
+        """
+        url = self.generateURL(validate)
+        if len(url) <= maxLength: return [url]
+        if not self.__stops: raise ValueError("The url is too long and has no stops to split: " + url)
+        legParameters = dict((key, value) for key, value in self.__parameterDictionary.items() if key not in ("start", "stops"))
+        fixedURL = NavigatorURLScheme(legParameters, self.__encodingCache, self.__stats).generateURL(validate)
+        fixedLength = len(fixedURL) - (1 if fixedURL.endswith("?") else 0)  # each fragment below adds its "&"
+        fragmentsLength = lambda fragments: sum(len(fragment) + 1 for fragment in fragments)
+        stopLengths = [fragmentsLength(self._encodedLocations([stop])) for stop in self.__stops]
+        legs, legStart, first = [], self.__start, 0
+        while first < len(self.__stops):
+            last, length = first, fixedLength + fragmentsLength(self._encodedLocations(legStart, isStop=False))
+            while last < len(self.__stops) and length + stopLengths[last] <= maxLength:
+                length += stopLengths[last]
+                last += 1
+            if last == first: raise ValueError("The stop does not fit in a url of " + str(maxLength) + " characters: " + str(self.__stops[first]))
+            legDictionary = dict(legParameters, stops=self.__stops[first:last])
+            if legStart: legDictionary["start"] = legStart
+            legs.append(NavigatorURLScheme(legDictionary, self.__encodingCache, self.__stats).generateURL(validate))
+            legStart, first = self.__stops[last - 1], last
+        return legs
+
+    def _validatedValue(self, value, validate=True):
+        """
+        supporting function of generateURL to check a value that is not passed through quote_plus
+        :param value: the raw parameter value
+        :param validate: optional boolean, when False the value is returned unchecked
+        :return: value: the unchanged value
+        """
+        if validate:
+            for char in self.__invalidStringCharacters:
+                if char in value: raise ValueError("Invalid encoded value entered: " + value)
+        return value
 
     def _encodedTravelMode(self, string=None):
         """
         generic function to encode travel mode if one is passed in via the parameterDictionary
         :param string: optional string for travel mode
-        :return: travelmodelBuilder or None: returns encoded travel mode if one exists for inputted string
-        """
-        travelmodeBuilder = ""
-        formattedString = str(string).lower().replace(" ", "")
-        switcher = {
-            "drivingtime": "Driving Time",
-            "drivingdistance": "Driving Distance",
-            "truckingtime": "Trucking Time",
-            "truckingdistance": "Trucking Distance",
-            "walkingtime": "Walking Time",
-            "walkingdistance": "Walking Distance",
-            "ruraldrivingtime": "Rural Driving Time",
-            "ruraldrivingdistance": "Rural Driving Distance",
-        }
-        mode = switcher.get(formattedString, None)
-        if mode:
-            if self.__parameterCount > 0: travelmodeBuilder += "&"
-            travelmodeBuilder += urllib.parse.quote_plus(mode)
-            return travelmodeBuilder
-        else: return None
+        :return: mode or None: returns encoded travel mode if one exists for inputted string
+        """
+        return self.__travelModes.get(str(string).lower().replace(" ", ""), None)
 
     def _encodedLocations(self, listLocations=None, isStop=True):
         """
         generic function for stops and starts assuming always list of lists of stops OR list of start
         :param listLocations: [['43.222,-76.444','esri'],['100 Commercial St, Portland, ME,04101','esri']] OR ['43.222,-76.444','esri']
+                              OR NavigatorURLStops
         :param isStop: Boolean for start or stop
-        :return: stopBuilder: encode stop and starts
+        :return: locationParameters: list of encoded stop and start parameters [param=value, param=value, ...]
         """
-        stopBuilder = ""
+        if isStop and isinstance(listLocations, NavigatorURLStops): return listLocations.encodedFragments(self.__quote)
+        locationParameters = []
         if listLocations:
-            if not isStop:
-                if self.__parameterCount > 0: stopBuilder += "&"
-                locationType, locationNameType = "start=", "&startname="
-                hasName = True if len(listLocations) > 1 else False
-                if hasName:
-                    location, locationName = urllib.parse.quote_plus(str(listLocations[0]), ",'"), urllib.parse.quote_plus(str(listLocations[1]), ",'")
-                    stopBuilder += locationType + location + locationNameType + locationName
-                else:
-                    location = urllib.parse.quote_plus(str(listLocations[0]), ",'")
-                    stopBuilder += locationType + location
-            else:
-                locationType, locationNameType = "stop=", "&stopname="
-                stop_count = 0
-                for listLocation in listLocations:
-                    hasName = True if len(listLocation) > 1 else False
-                    if self.__parameterCount > 0: stopBuilder += "&"
-                    elif stop_count > 0: stopBuilder += "&"
-                    if hasName:
-                        location, locationName = urllib.parse.quote_plus(str(listLocation[0]), ",'"), urllib.parse.quote_plus(str(listLocation[1]), ",'")
-                        stopBuilder += locationType + location + locationNameType + locationName
-                    else:
-                        location = urllib.parse.quote_plus(str(listLocation[0]), ",'")
-                        stopBuilder += locationType + location
-                    stop_count += 1
-        return stopBuilder
+            if isStop: locationType, locationNameType = "stop=", "stopname="
+            else: locationType, locationNameType, listLocations = "start=", "startname=", [listLocations]
+            for listLocation in listLocations:
+                locationParameters.append(locationType + self.__quote(str(listLocation[0])))
+                if len(listLocation) > 1:
+                    locationParameters.append(locationNameType + self.__quote(str(listLocation[1])))
+        return locationParameters
 
-    def _encodedCallback(self, callbackList=None):
+    def _encodedCallback(self, callbackList=None, validate=True):
         """
         generic function for encoding call backs
         :param callbackList: optional list for callback ["my-cool-app://", "My Cool App"]
-        :return: callbackBuilder: encoded the callback string
-        """
-        callbackBuilder = ""
-        hasPrompt = True if len(callbackList) > 1 else False
-        if self.__parameterCount > 0: callbackBuilder += "&"
-        if hasPrompt:
-            callbackScheme, callbackPrompt = str(callbackList[0]), urllib.parse.quote_plus(str(callbackList[1]), ",'")
-            callbackBuilder += "callback=" + callbackScheme + "&callbackprompt=" + callbackPrompt
-        else:
-            callbackScheme = str(callbackList[0])
-            callbackBuilder += "callback=" + callbackScheme
-        return callbackBuilder
+        :param validate: optional boolean to validate the callback scheme, which is not encoded
+        :return: callbackParameters: list of encoded callback parameters [param=value, param=value]
+        """
+        callbackParameters = ["callback=" + self._validatedValue(str(callbackList[0]), validate)]
+        if len(callbackList) > 1:
+            callbackParameters.append("callbackprompt=" + self.__quote(str(callbackList[1])))
+        return callbackParameters
+
+    @classmethod
+    def auditURL(cls, url, error='L', maxVersion=40):
+        """
+        function to check an existing url and report every problem found instead of raising on the first one
+        :param url: url string
+        :param error: optional QR error correction level used for the QR length check
+        :param maxVersion: optional largest QR version (1 to 40) allowed
+        :return: report: {"url", "valid", "invalidScheme", "invalidKeys", "unencodedValues", "countMismatches", "qrVersion", "tooLongForQR"}
+        """
+        applicationScheme, _, parameterString = url.partition("?")
+        report = {"url": url, "invalidScheme": applicationScheme != cls.__navigatorScheme,
+                  "invalidKeys": [], "unencodedValues": [], "countMismatches": []}
+        previousKey, seenKeys = None, set()
+        for parameter in parameterString.split("&"):
+            if not parameter: continue
+            parameterKey, _, parameterValue = parameter.partition("=")
+            if parameterKey not in cls.__validParameters: report["invalidKeys"].append(parameterKey)
+            elif cls.__unencodedCharacters.search(parameterValue) if parameterKey != "callback" else " " in parameterValue:
+                report["unencodedValues"].append(parameter)
+            if parameterKey in cls.__parameterOwners and previousKey != cls.__parameterOwners[parameterKey]:
+                report["countMismatches"].append(parameterKey + " does not follow a " + cls.__parameterOwners[parameterKey])
+            elif parameterKey in seenKeys and parameterKey in ("start", "startname", "optimize", "navigate", "travelmode", "callback", "callbackprompt"):
+                report["countMismatches"].append(parameterKey + " is repeated")
+            previousKey = parameterKey
+            seenKeys.add(parameterKey)
+        report["qrVersion"] = NavigatorURLQRCode().qrVersion(url, error, maxVersion)
+        report["tooLongForQR"] = report["qrVersion"] is None
+        report["valid"] = not (report["invalidScheme"] or report["invalidKeys"] or report["unencodedValues"] or report["countMismatches"])
+        return report
 
     def _validateURL(self, stringBuilder):
         """
-        generic function for validating url. deconstruct the URL and perform basic validity test
+        generic function for validating an existing url (generateURL validates while building).
+        deconstruct the URL and perform basic validity test
+        :param stringBuilder: takes the constructed url string
+        """
+        if self.__stats is None: return self._validatedURL(stringBuilder)
+        with self.__stats.stage("validateURL"): self._validatedURL(stringBuilder)
+
+    def _validatedURL(self, stringBuilder):
+        """
+        supporting function of validateURL to run the checks
         :param stringBuilder: takes the constructed url string
         """
         applicationScheme, parameterString = self._splitStringBuilder(stringBuilder)
@@ -170,8 +1009,7 @@ class NavigatorURLScheme:
         parameters = self._splitParameterString(parameterString)
         if parameters is not None:
             for parameter in parameters:
-                parameterSplit = parameter.split("=")
-                parameterKey, parameterValue = parameterSplit[0], parameterSplit[1]
+                parameterKey, _, parameterValue = parameter.partition("=")
                 if parameterKey not in self.__validParameters: raise ValueError("Invalid parameter key entered: " + parameterKey)
                 for char in self.__invalidStringCharacters:
                     if char in parameterValue: raise ValueError("Invalid encoded value entered: " + parameterValue)
@@ -182,10 +1020,8 @@ class NavigatorURLScheme:
         :param stringBuilder: takes the constructed url string
         :return: applicationScheme, parameterString: splits the string by applicationScheme and parameterString
         """
-        stringBuilderSplit = stringBuilder.split("?")
-        if len(stringBuilderSplit) > 1: applicationScheme, parameterString = str(stringBuilderSplit[0]), str(stringBuilderSplit[1])
-        else: applicationScheme, parameterString = str(stringBuilderSplit[0]), None
-        return applicationScheme, parameterString
+        applicationScheme, separator, parameterString = str(stringBuilder).partition("?")
+        return applicationScheme, parameterString if separator else None
 
     def _splitParameterString(self, parameterString):
         """
@@ -198,13 +1034,171 @@ class NavigatorURLScheme:
         return parameters
 
 
+_RouteLocation = collections.namedtuple("_RouteLocation", ["location", "encodedLocation", "encodedName", "coordinate"])
+
+
+class NavigatorURLSchemeRegistry:
+    """
+    generic registry of the app schemes NavigatorURLScheme.generateLinks publishes a route to. each scheme is a function
+    building its link from the normalized route (locations and names already quoted) and applying its own validation.
+    registered: "navigator", "collector", "explorer" and "googlemaps"
+    """
+    __schemes = collections.OrderedDict()  # scheme name -> function(route, validate) returning the url
+    __appliesTo = {}  # scheme name -> function(route) returning False for routes left out of the default schemes
+
+    @classmethod
+    def register(cls, name, buildLink, appliesTo=None):
+        """
+        adds (or replaces) an app scheme
+        :param name: scheme name i.e. "navigator"
+        :param buildLink: function(route, validate) returning the url of a route (see NavigatorURLScheme._normalizedRoute),
+                          raising ValueError for a route the app cannot open
+        :param appliesTo: optional function(route) returning whether the scheme is one of the default schemes of the route
+                          (None for every route), so generateLinks() without schemes skips i.e. map apps without a map
+        """
+        cls.__schemes[name] = buildLink
+        cls.__appliesTo[name] = appliesTo
+
+    @classmethod
+    def names(cls):
+        """
+        :return: names: list of the registered scheme names in registration order
+        """
+        return list(cls.__schemes)
+
+    @classmethod
+    def applicableNames(cls, route):
+        """
+        :param route: normalized route, see NavigatorURLScheme._normalizedRoute
+        :return: names: list of the registered scheme names that apply to the route in registration order
+        """
+        return [name for name in cls.__schemes if cls.__appliesTo[name] is None or cls.__appliesTo[name](route)]
+
+    @classmethod
+    def buildLink(cls, name):
+        """
+        :param name: registered scheme name
+        :return: buildLink: the function building the links of the scheme
+        """
+        buildLink = cls.__schemes.get(name, None)
+        if buildLink is None: raise ValueError("Invalid app scheme entered: " + str(name))
+        return buildLink
+
+
+def _centerLocation(route):
+    """
+    supporting function of the collector and explorer links
+    :return: the _RouteLocation the map is centered on, the first stop (or the start), None for an empty route
+    """
+    return route["stops"][0] if route["stops"] else route["start"]
+
+
+def _centersOnCoordinate(route):
+    """
+    supporting function of the collector and explorer schemes to tell whether they apply to a route
+    :return: boolean, True when the first stop (or the start) is a 'lat,lon' coordinate
+    """
+    location = _centerLocation(route)
+    return location is not None and location.coordinate is not None
+
+
+def _centerLink(applicationScheme, appName, route, validate=True, requiresItem=False):
+    """
+    supporting function of the collector and explorer links, which open a map centered on the first stop (or the start)
+    :param applicationScheme: i.e. "arcgis-collector://"
+    :param appName: name of the app in the error messages
+    :param route: normalized route, see NavigatorURLScheme._normalizedRoute
+    :param validate: optional boolean to check the route can be opened by the app
+    :param requiresItem: optional boolean, True when the app needs the 'itemid' of the map to open
+    :return: the url
+    """
+    location = _centerLocation(route)
+    itemID = route["parameters"].get("itemid", None)
+    if validate:
+        if requiresItem and not itemID: raise ValueError(appName + " links need the 'itemid' of the map to open")
+        if location is None or location.coordinate is None: raise ValueError(appName + " links need a 'lat,lon' location to center on")
+    parameters = ["itemID=" + _quote(str(itemID))] if itemID else []
+    if location is not None and location.coordinate is not None: parameters.append("center=" + location.encodedLocation)
+    return applicationScheme + "?" + "&".join(parameters)
+
+
+def _collectorLink(route, validate=True):
+    """
+    link of a normalized route for Collector, registered as "collector": the map 'itemid' of the parameter dictionary
+    centered on the first stop (names, start and the other parameters have no Collector equivalent)
+    """
+    return _centerLink("arcgis-collector://", "Collector", route, validate, requiresItem=True)
+
+
+def _explorerLink(route, validate=True):
+    """
+    link of a normalized route for Explorer, registered as "explorer": centered on the first stop, in the map 'itemid'
+    of the parameter dictionary when there is one
+    """
+    return _centerLink("arcgis-explorer://", "Explorer", route, validate)
+
+
+_googleMapsTravelModes = {
+    "drivingtime": "driving", "drivingdistance": "driving", "truckingtime": "driving", "truckingdistance": "driving",
+    "ruraldrivingtime": "driving", "ruraldrivingdistance": "driving", "walkingtime": "walking", "walkingdistance": "walking",
+}  # navigator travel modes -> google maps directionsmode
+
+
+def _googleMapsLink(route, validate=True):
+    """
+    link of a normalized route for Google Maps, registered as "googlemaps": directions from the start (or the current
+    location) through the stops in order. google maps has no stop names, callback or optimize, they are left out
+    :param route: normalized route, see NavigatorURLScheme._normalizedRoute
+    :param validate: optional boolean to check the route can be opened by the app
+    :return: the url
+    """
+    directionsMode = _googleMapsTravelModes.get(route["travelMode"], None)
+    if validate:
+        if not route["stops"]: raise ValueError("Google Maps links need at least one stop")
+        if route["travelMode"] is not None and directionsMode is None:
+            raise ValueError("Invalid travel mode for Google Maps entered: " + str(route["parameters"].get("travelmode")))
+    parameters = ["saddr=" + route["start"].encodedLocation] if route["start"] else []
+    parameters.append("daddr=" + "+to:".join(stop.encodedLocation for stop in route["stops"]))
+    if directionsMode: parameters.append("directionsmode=" + directionsMode)
+    return "comgooglemaps://?" + "&".join(parameters)
+
+
+NavigatorURLSchemeRegistry.register("navigator", NavigatorURLScheme._navigatorLink)
+NavigatorURLSchemeRegistry.register("collector", _collectorLink, lambda route: _centersOnCoordinate(route) and bool(route["parameters"].get("itemid", None)))
+NavigatorURLSchemeRegistry.register("explorer", _explorerLink, _centersOnCoordinate)
+NavigatorURLSchemeRegistry.register("googlemaps", _googleMapsLink, lambda route: bool(route["stops"]) and
+                                    (route["travelMode"] is None or route["travelMode"] in _googleMapsTravelModes))
+
+
 class NavigatorURLHyperlinks:
     """
     generic class for hyperlink tools related to app link
     """
-    # empty constructor
-    def __init__(self):
-        pass
+    # html templates, bound once so each row of a page costs a single format call
+    __pageRow = "{group}<a href=\"{url}\">{count}. {title}</a>{result}<a>{url}</a><br><br>\n{qrcode}".format
+    __styledPageRow = "{group}<a href=\"{url}\">{count}. {title}</a>{result}<a>{url}</a><br>\n{qrcode}".format
+    __pageRowResult = "<a>\t({})</a><br>".format  # the PASS/FAIL info
+    __pageRowGroup = "<b>{}</b><br>".format  # the test group info
+    __pageQRCode = str("<a href=\"#qrPopup{count}\" data-rel=\"popup\" data-position-to=\"window\">{thumbnail}</a>"
+                       "<div data-role=\"popup\" id=\"qrPopup{count}\">"
+                       "<a href=\"#pageone\" data-rel=\"back\" class =\"ui-btn ui-corner-all ui-shadow ui-btn-a ui-icon-delete ui-btn-icon-notext ui-btn-right\">Close</a><img src=\"{image}\" alt=\"{alt}\"{lazy}>"
+                       "</div>").format
+    __pageThumbnail = "<img src=\"./qrcodes/sample.png\" alt=\"QR Popup\" style=\"width:200px;\">"
+    __styledPageQRCode = str("<a class=\"thumb\" href=\"#\">{thumbnail}<span> <img src=\"{image}\" alt=\"{alt}\"{lazy}></span></a><br><br>").format
+    __styledPageThumbnail = "<img src=\"./qrcodes/sample.png\" style=\"height: 20px; width: 20px;\" alt=\"QR Popup\">"
+    __embeddedThumbnail = "QR code"  # embedded pages reference no image files, not even the thumbnail
+    __lazyImage = " loading=\"lazy\" decoding=\"async\""
+    __indexRow = "<a href=\"{0}\">Page {1}: links {2} - {3}</a><br>\n".format
+
+    def __init__(self, stats=None, sink=None):
+        """
+        constructor for the hyperlink tools
+        :param stats: optional NavigatorURLStats recording the htmlWrite, qrSave and csvRead stages and the progress messages
+        :param sink: optional output sink the pages and QR codes are written to (NavigatorURLDirectorySink,
+                     NavigatorURLMemorySink or NavigatorURLArchiveSink), None writes files relative to the working directory
+        """
+        self.__stats = stats
+        self.__sink = sink if sink is not None else NavigatorURLDirectorySink()
 
     def generateHTMLlink(self, validURL, title):
         """
@@ -213,124 +1207,304 @@ class NavigatorURLHyperlinks:
         :param title: title of hyperlink as string
         """
         outfile = "applink_" + str(title) + ".htm"
-        fp = open(outfile, 'w')
+        fp = self.__sink.open(outfile)
         fp.write("<!doctype html public \"-//w3c/dtd html 4.0 Transitional//en\">\
         <html> <head><title>HTML Link</title></head> <body bgcolor=\"white\"> <h1>HTML Link</h1><p><br>\n")
-        print("Generating HTML file at location of library...")
+        _progress(self.__stats, "Generating HTML file at location of library...")
         urlString = str("<a href=\"{}\">Click here to open the navigator app link </a><br>\n").format(validURL)
         # Example of what string looks like --Delete after testing
-        print(urlString)
+        _progress(self.__stats, urlString)
         # Write link to file
         fp.write(urlString)
         fp.write("</body></html>")
         fp.close()
 
-    def generateHTMLpage(self, validURLs, title, includeQR=False, imageDirectory=None):
+    def generateHTMLpage(self, validURLs, title, includeQR=False, imageDirectory=None, linksPerPage=None, qrWorkers=None, qrCache=None,
+                         manifest=None, qrEmbed=None):
         """
         generates a html page given
         :param validURLs: a list of url lists [[urlStr_1, urlTitleStr_1], .... , [urlStr_N, urlTitleStr_N]]
         :param title: title of html page as string
+        :param includeQR: optional boolean to save and show a QR code per link
+        :param imageDirectory: optional directory the QR codes are saved to
+        :param linksPerPage: optional number of links per page, splits output into numbered pages plus an index page
+        :param qrWorkers: optional number of processes rendering QR codes concurrently (None renders them inline)
+        :param qrCache: optional NavigatorURLQRCodeCache the QR codes are copied from instead of rendered again
+        :param manifest: optional NavigatorURLManifest of the last build, only the changed pages and QR codes are written again
+        :param qrEmbed: optional "png" or "svg" to embed each QR code in the page as a lazily loaded data uri instead of saving
+                        it to imageDirectory, so each page is a single self-contained file
+        :return: qrFailures: list of [linkNumber, urlTitle, error] for each QR code that could not be saved
         """
-        outfile = "applinksPage_" + str(title) + ".htm"
-        fp = open(outfile, 'w')
-        fp.write(str("<!doctype html public \"-//w3c/dtd html 4.0 Transitional//en\">\
-        <html> <head><title>{}: Navigator App Links</title></head> <body bgcolor=\"white\"> <h1>{}: Navigator App Links</h1><p><br>\n").format(str(title), str(title)))
-        print("Generating HTML page at location of library...")
-        print("Processing hyperlinks...\n")
-        count = 1
-        for validURL in validURLs:
-            url = str(validURL[0])
-            urlTitle = str(validURL[1]).replace("/", "").replace(".", "")
-            # html bits
-            urllinkHTMLString = str("<a href=\"{}\">{}. {}</a>").format(url, str(count), urlTitle)  # the hyperlink
-            urltitleHTMLString = str("<a>{}</a><br><br>\n").format(url)  # the url scheme text
-            # additional indices if used
-            validURLcomments, validURLcomments2 = "", ""
-            if len(validURL) > 2:
-                comments1 = validURL[2]
-                comments2 = validURL[3]
-                if validURL[2] is not "": validURLcomments = str("<a>\t({})</a><br>").format(comments1)  # the PASS/FAIL info
-                if validURL[3] is not "": validURLcomments2 = str("<b>{}</b><br>").format(comments2)  # the test group info
-            if includeQR:
-                try:
-                    NavigatorURLQRCode().saveQRCodePNG(url, urlTitle, imageDirectory)
-                except:
-                    print("skipping code, too big.....")
-                qrcodeHTML = "<a href=\"#myPopup\" data-rel=\"popup\" data-position-to=\"window\">" \
-                             "<img src=\"./qrcodes/sample.png\" alt=\"QR Popup\" style=\"width:200px;\"></a>" \
-                             "<div data-role=\"popup\" id=\"myPopup\">" \
-                             "<a href=\"#pageone\" data-rel=\"back\" class =\"ui-btn ui-corner-all ui-shadow ui-btn-a ui-icon-delete ui-btn-icon-notext ui-btn-right\">Close</a><img src=\"./qrcodes/{}.png\" alt=\"{}\">" \
-                             "</div>".format(urlTitle, url)
-
-                # qrcodeImageHTML = "<img src=\"./qrcodes/{}.png\"></img>".format(urlTitle)
-            # # Example of what string looks like --Delete after testing
-            # if validURL[3] is not "": print(validURL[3])
-            # print(validURL[1])
-            # if validURL[2] is not "": print(validURL[2]
-            # print(validURL[0] + "\n")
-            # Write info to file
-            if validURLcomments2 is not "": fp.write(validURLcomments2)
-            fp.write(urllinkHTMLString)
-            if validURLcomments is not "": fp.write(validURLcomments)
-            else: fp.write("<br>")
-            fp.write(urltitleHTMLString)
-
-            if includeQR: fp.write(qrcodeHTML)
-
-            count += 1
-        fp.write("</body></html>")
-        fp.close()
-        print("HTML page completed")
+        pageHeader = str("<!doctype html public \"-//w3c/dtd html 4.0 Transitional//en\">\
+        <html> <head><title>{0}: Navigator App Links</title></head> <body bgcolor=\"white\"> <h1>{0}: Navigator App Links</h1><p><br>\n").format
+        _progress(self.__stats, "Generating HTML page at location of library...")
+        _progress(self.__stats, "Processing hyperlinks...\n")
+        pageQRCode = functools.partial(self.__pageQRCode, thumbnail=self.__embeddedThumbnail if qrEmbed else self.__pageThumbnail)
+        qrFailures = self._writeHTMLpages(validURLs, title, pageHeader, "</body></html>", self.__pageRow, pageQRCode,
+                                          includeQR, imageDirectory, linksPerPage, qrWorkers, qrCache, manifest, qrEmbed)
+        _progress(self.__stats, "HTML page completed")
+        return qrFailures
 
-
-    def generateStyledHTMLpage(self, validURLs, title, styleFile=None, includeQR=False, imageDirectory=None):
+    def generateStyledHTMLpage(self, validURLs, title, styleFile=None, includeQR=False, imageDirectory=None, linksPerPage=None, qrWorkers=None, qrCache=None,
+                               manifest=None, qrEmbed=None):
         """
         generates a html page given
         :param validURLs: a list of url lists [[urlStr_1, urlTitleStr_1], .... , [urlStr_N, urlTitleStr_N]]
         :param title: title of html page as string
+        :param styleFile: optional stylesheet linked from the page
+        :param includeQR: optional boolean to save and show a QR code per link
+        :param imageDirectory: optional directory the QR codes are saved to
+        :param linksPerPage: optional number of links per page, splits output into numbered pages plus an index page
+        :param qrWorkers: optional number of processes rendering QR codes concurrently (None renders them inline)
+        :param qrCache: optional NavigatorURLQRCodeCache the QR codes are copied from instead of rendered again
+        :param manifest: optional NavigatorURLManifest of the last build, only the changed pages and QR codes are written again
+        :param qrEmbed: optional "png" or "svg" to embed each QR code in the page as a lazily loaded data uri instead of saving
+                        it to imageDirectory, so each page is a single self-contained file
+        :return: qrFailures: list of [linkNumber, urlTitle, error] for each QR code that could not be saved
         """
-        print("Generating HTML page at location of library...")
-        print("Processing hyperlinks...\n")
-        outfile = "applinksPage_" + str(title) + ".htm"
-        fp = open(outfile, 'w')
-        fp.write(str("<!doctype html public \"-//w3c/dtd html 4.0 Transitional//en\">"
-                     "<html> <head><title>{}: Navigator App Links</title>").format(str(title)))
-        if styleFile: fp.write(str("<link rel=\"stylesheet\" type=\"text/css\" href=\"{}\">").format(styleFile))
-        fp.write(str("</head> <body bgcolor=\"white\"> <h1>{}: Navigator App Links</h1><p><div id=\"thumbwrap\">\n").format(str(title)))
-        count = 1
-        for validURL in validURLs:
-            url = str(validURL[0])
-            urlTitle = str(validURL[1]).replace("/", "").replace(".", "")
-            # html bits
-            urllinkHTMLString = str("<a href=\"{}\">{}. {}</a>").format(url, str(count), urlTitle)  # the hyperlink
-            urltitleHTMLString = str("<a>{}</a><br>\n").format(url)  # the url scheme text
-            # additional indices if used
-            validURLcomments, validURLcomments2 = "", ""
-            if len(validURL) > 2:
-                comments1 = validURL[2]
-                comments2 = validURL[3]
-                if validURL[2] is not "": validURLcomments = str("<a>\t({})</a><br>").format(comments1)  # the PASS/FAIL info
-                if validURL[3] is not "": validURLcomments2 = str("<b>{}</b><br>").format(comments2)  # the test group info
-            if includeQR:
-                try:
-                    NavigatorURLQRCode().saveQRCodePNG(url, urlTitle, imageDirectory)
-                except:
-                    print("skipping code, too big.....")
-                qrcodeHTML = "<a class=\"thumb\" href=\"#\"><img src=\"./qrcodes/sample.png\" style=\"height: 20px; width: 20px;\" " \
-                             "alt=\"QR Popup\"><span> <img src=\"./qrcodes/{}.png\" alt=\"{}\"></span></a><br><br>".format(urlTitle, url)
-            if validURLcomments2 is not "": fp.write(validURLcomments2)
-            fp.write(urllinkHTMLString)
-            if validURLcomments is not "": fp.write(validURLcomments)
-            else: fp.write("<br>")
-            fp.write(urltitleHTMLString)
-            if includeQR: fp.write(qrcodeHTML)
-            count += 1
-        fp.write("</div></body></html>")
-        fp.close()
-        print("HTML page completed")
+        _progress(self.__stats, "Generating HTML page at location of library...")
+        _progress(self.__stats, "Processing hyperlinks...\n")
+        styleLink = str("<link rel=\"stylesheet\" type=\"text/css\" href=\"{}\">").format(styleFile) if styleFile else ""
+        pageHeader = str("<!doctype html public \"-//w3c/dtd html 4.0 Transitional//en\">"
+                         "<html> <head><title>{0}: Navigator App Links</title>" + styleLink.replace("{", "{{").replace("}", "}}") +
+                         "</head> <body bgcolor=\"white\"> <h1>{0}: Navigator App Links</h1><p><div id=\"thumbwrap\">\n").format
+        pageQRCode = functools.partial(self.__styledPageQRCode, thumbnail=self.__embeddedThumbnail if qrEmbed else self.__styledPageThumbnail)
+        qrFailures = self._writeHTMLpages(validURLs, title, pageHeader, "</div></body></html>", self.__styledPageRow, pageQRCode,
+                                          includeQR, imageDirectory, linksPerPage, qrWorkers, qrCache, manifest, qrEmbed)
+        _progress(self.__stats, "HTML page completed")
+        return qrFailures
 
-
-    def csv2Lists(self, csvLocation, delimiter=','):
+    def _writeHTMLpages(self, validURLs, title, pageHeader, pageFooter, pageRow, pageQRCode, includeQR, imageDirectory, linksPerPage,
+                        qrWorkers=None, qrCache=None, manifest=None, qrEmbed=None):
+        """
+        supporting function of generateHTMLpage and generateStyledHTMLpage to stream rows into one or more pages.
+        each row is rendered with a single template call and written once, so memory stays constant in the number of links
+        (with a manifest each page is held in memory until its content hash is compared, use linksPerPage for large link sets)
+        :param validURLs: iterable of url lists [[urlStr_1, urlTitleStr_1], .... , [urlStr_N, urlTitleStr_N]]
+        :param title: title of html page as string
+        :param pageHeader: bound format of the page header, called with the page title
+        :param pageFooter: string closing each page
+        :param pageRow: bound format of a row
+        :param pageQRCode: bound format of the QR code html of a row, called with count, image, alt and lazy
+        :param includeQR: boolean to save and show a QR code per link
+        :param imageDirectory: directory the QR codes are saved to
+        :param linksPerPage: number of links per page or None for a single page
+        :param qrWorkers: number of processes rendering QR codes concurrently or None to render inline
+        :param qrCache: optional NavigatorURLQRCodeCache
+        :param manifest: optional NavigatorURLManifest, unchanged pages and QR codes are skipped and the ones no longer written removed
+        :param qrEmbed: optional "png" or "svg" to embed the QR codes as data uris instead of saving them
+        :return: qrFailures: list of [linkNumber, urlTitle, error] for each QR code that could not be saved
+        """
+        if qrEmbed not in (None, "png", "svg"): raise ValueError("Invalid QR code image format entered: " + str(qrEmbed))
+        if (manifest is not None or (qrCache is not None and includeQR and not qrEmbed)) and self.__sink.path("") is None:
+            raise ValueError("A manifest or QR code cache needs a sink writing files (NavigatorURLDirectorySink)")
+        import html
+        pageRanges = []  # [first link, last link] of each page, for the index page
+        fp = None
+        count = 0
+        qrFailures = []
+        rows = self._renderedQRCodes(validURLs, includeQR, imageDirectory, qrWorkers, qrCache, manifest, qrEmbed)
+        for count, validURL, url, urlTitle, qrError, qrImage in rows:
+            if fp is None or (linksPerPage and (count - 1) % linksPerPage == 0):
+                fp = self._nextHTMLpage(fp, title, pageHeader, pageFooter, pageRanges, linksPerPage, count, manifest)
+            # additional indices if used (PASS/FAIL info and test group info)
+            result, group = (validURL[2], validURL[3]) if len(validURL) > 2 else ("", "")
+            if qrError is not None:
+                _progress(self.__stats, "Link " + str(count) + " (" + urlTitle + "): QR code not saved, " + qrError)
+                qrFailures.append([count, urlTitle, qrError])
+            with self.__stats.stage("htmlWrite") if self.__stats is not None else _noStage:
+                if not includeQR: qrcode = ""
+                elif qrEmbed: qrcode = pageQRCode(count=count, image=qrImage or "", alt=html.escape(url), lazy=self.__lazyImage)
+                else: qrcode = pageQRCode(count=count, image="./qrcodes/" + urllib.parse.quote(urlTitle) + ".png", alt=html.escape(url), lazy="")
+                fp.write(pageRow(url=url, count=count, title=urlTitle, qrcode=qrcode,
+                                 result=self.__pageRowResult(result) if result != "" else "<br>",
+                                 group=self.__pageRowGroup(group) if group != "" else ""))
+        if fp is None: fp = self._nextHTMLpage(fp, title, pageHeader, pageFooter, pageRanges, linksPerPage, 1, manifest)
+        self._closeHTMLpage(fp, title, pageFooter, pageRanges, linksPerPage, count, isLastPage=True, manifest=manifest)
+        if linksPerPage:
+            fp = self._openHTMLpage(self._pageFilename(title), manifest)
+            fp.write(pageHeader(str(title)))
+            for pageNumber, pageRange in enumerate(pageRanges, 1):
+                fp.write(self.__indexRow(self._pageFilename(title, pageNumber), pageNumber, pageRange[0], pageRange[1]))
+            fp.write(pageFooter)
+            self._savedHTMLpage(fp, self._pageFilename(title), manifest)
+        if manifest is not None:
+            removed = manifest.finish()
+            if removed: _progress(self.__stats, "Removed " + str(len(removed)) + " pages and QR codes no longer generated")
+        return qrFailures
+
+    def _renderedQRCodes(self, validURLs, includeQR, imageDirectory, qrWorkers, qrCache=None, manifest=None, qrEmbed=None):
+        """
+        supporting function of _writeHTMLpages to save the QR code of each link, optionally in a pool of processes.
+        at most a few renders per worker are in flight and rows are yielded in their original order. with a qrCache,
+        cached urls are copied instead of rendered and identical urls within the batch are rendered once. with a manifest,
+        images of the last build whose url did not change are kept as they are. with qrEmbed, the QR codes are rendered in
+        memory and returned as data uris (the cache and manifest only apply to image files)
+        :param validURLs: iterable of url lists [[urlStr_1, urlTitleStr_1], .... , [urlStr_N, urlTitleStr_N]]
+        :param includeQR: boolean, False yields the rows without rendering
+        :param imageDirectory: directory the QR codes are saved to
+        :param qrWorkers: number of processes rendering QR codes concurrently or None to render inline
+        :param qrCache: optional NavigatorURLQRCodeCache
+        :param manifest: optional NavigatorURLManifest
+        :param qrEmbed: optional "png" or "svg" to render data uris instead of saving images
+        :return: yields count, validURL, url, urlTitle, qrError (None when saved or not rendered), qrImage (the data uri when embedded) for each row
+        """
+        rows = ((count, validURL, str(validURL[0]), str(validURL[1]).replace("/", "").replace(".", ""))
+                for count, validURL in enumerate(validURLs, 1))
+        if not includeQR:
+            for row in rows: yield row + (None, None)
+            return
+        if qrEmbed: qrCache, manifest = None, None
+        elif imageDirectory and self.__sink.path(imageDirectory) is not None: os.makedirs(self.__sink.path(imageDirectory), exist_ok=True)
+        import concurrent.futures
+        pool = concurrent.futures.ProcessPoolExecutor(qrWorkers) if qrWorkers else None
+        try:
+            pending = collections.deque()
+            rendering = {}  # cache path -> the render filling it, shared by identical urls in flight
+            for row in rows:
+                pending.append(self._submitQRCode(pool, row, imageDirectory, qrCache, rendering, manifest, qrEmbed))
+                if len(pending) >= (qrWorkers or 1) * 4:
+                    yield self._savedQRCode(pending.popleft(), imageDirectory, qrCache, rendering, manifest, qrEmbed)
+            while pending:
+                yield self._savedQRCode(pending.popleft(), imageDirectory, qrCache, rendering, manifest, qrEmbed)
+        finally:
+            if pool is not None: pool.shutdown()
+
+    def _submitQRCode(self, pool, row, imageDirectory, qrCache, rendering, manifest=None, qrEmbed=None):
+        """
+        supporting function of _renderedQRCodes to start saving the QR code of a row
+        :param pool: process pool or None to render inline
+        :param row: count, validURL, url, urlTitle
+        :return: row, future (None when copied from the cache or unchanged since the manifest), cachePath (None without a cache)
+        """
+        url, urlTitle = row[2], row[3]
+        if qrEmbed: return row, self._runQRCode(pool, _renderedQRCodeImage, url, qrEmbed), None
+        imagePath = self.__sink.path(_sinkName(imageDirectory, urlTitle + ".png"))
+        if imagePath is None: return row, self._runQRCode(pool, _renderedQRCodeImage, url, "png"), None
+        if manifest is not None:
+            contentHash = manifest.contentHash(url, "png", 10, 'L')
+            if manifest.unchanged(imagePath, contentHash):
+                manifest.record(imagePath, contentHash)
+                return row, None, None
+        if qrCache is None: return row, self._runQRCode(pool, _saveQRCodePNG, url, imagePath), None
+        cachePath = qrCache.cachePath(url)
+        if cachePath not in rendering:
+            copied = qrCache.copyTo(cachePath, imagePath)
+            if self.__stats is not None: self.__stats.count("qrCache", hits=int(copied), misses=int(not copied))
+            if copied: return row, None, None
+            rendering[cachePath] = self._runQRCode(pool, _renderQRCodeFile, url, cachePath)
+        return row, rendering[cachePath], cachePath
+
+    def _runQRCode(self, pool, function, *args):
+        """
+        supporting function of _submitQRCode to run a render in the pool, or inline when there is none
+        (inline renders record their qrEncode and render stages, renders in worker processes cannot)
+        :return: future: the future of the render
+        """
+        if pool is not None: return pool.submit(function, *args)
+        import concurrent.futures
+        future = concurrent.futures.Future()
+        future.set_result(function(*args, stats=self.__stats))
+        return future
+
+    def _savedQRCode(self, submitted, imageDirectory, qrCache, rendering, manifest=None, qrEmbed=None):
+        """
+        supporting function of _renderedQRCodes to wait for the QR code of a row and copy it out of the cache
+        (or write the rendered image to a sink without files, or turn it into a data uri)
+        :param submitted: row, future, cachePath as returned by _submitQRCode
+        :return: count, validURL, url, urlTitle, qrError, qrImage
+        """
+        row, future, cachePath = submitted
+        if self.__stats is not None and future is not None and not future.done():
+            with self.__stats.stage("qrWait"): future.result()
+        qrError = future.result() if future is not None else None
+        imageName = _sinkName(imageDirectory, row[3] + ".png")
+        if isinstance(qrError, tuple):  # rendered in memory: image, qrError
+            image, qrError = qrError
+            if qrEmbed and image is not None:
+                import base64
+                mediaType = "image/png" if qrEmbed == "png" else "image/svg+xml"
+                return row + (qrError, "data:" + mediaType + ";base64," + base64.b64encode(image).decode("ascii"))
+            if image is not None: self.__sink.write(imageName, image)
+            return row + (qrError, None)
+        imagePath = self.__sink.path(imageName)
+        if cachePath is not None:
+            if rendering.get(cachePath) is future:
+                del rendering[cachePath]
+                if qrError is None: qrCache.added(cachePath)
+            if qrError is None and not qrCache.copyTo(cachePath, imagePath, isLookup=False):
+                qrError = _saveQRCodePNG(row[2], imagePath)  # evicted while in flight
+        if manifest is not None and qrError is None:
+            manifest.record(imagePath, manifest.contentHash(row[2], "png", 10, 'L'))
+        return row + (qrError, None)
+
+    def _nextHTMLpage(self, fp, title, pageHeader, pageFooter, pageRanges, linksPerPage, count, manifest=None):
+        """
+        supporting function of _writeHTMLpages to close the current page (if any) and open the next one
+        :param fp: the open page or None
+        :param count: number of the first link on the next page
+        :param manifest: optional NavigatorURLManifest
+        :return: fp: the newly opened page
+        """
+        if fp is not None: self._closeHTMLpage(fp, title, pageFooter, pageRanges, linksPerPage, count - 1, manifest=manifest)
+        pageNumber = len(pageRanges) + 1 if linksPerPage else None
+        fp = self._openHTMLpage(self._pageFilename(title, pageNumber), manifest)
+        fp.write(pageHeader(str(title) + (" (page " + str(pageNumber) + ")" if pageNumber else "")))
+        pageRanges.append([count, count])
+        return fp
+
+    def _closeHTMLpage(self, fp, title, pageFooter, pageRanges, linksPerPage, count, isLastPage=False, manifest=None):
+        """
+        supporting function of _writeHTMLpages to write the navigation and footer of a page and close it
+        :param fp: the open page
+        :param count: number of the last link on the page
+        :param isLastPage: boolean, the last page has no link to a next page
+        :param manifest: optional NavigatorURLManifest
+        """
+        pageRanges[-1][1] = count
+        if linksPerPage:
+            pageNumber = len(pageRanges)
+            navigation = "<p><a href=\"" + self._pageFilename(title) + "\">Index</a>"
+            if pageNumber > 1: navigation += " <a href=\"" + self._pageFilename(title, pageNumber - 1) + "\">Previous</a>"
+            if not isLastPage: navigation += " <a href=\"" + self._pageFilename(title, pageNumber + 1) + "\">Next</a>"
+            fp.write(navigation + "</p>\n")
+        fp.write(pageFooter)
+        self._savedHTMLpage(fp, self._pageFilename(title, len(pageRanges) if linksPerPage else None), manifest)
+
+    def _openHTMLpage(self, filename, manifest=None):
+        """
+        supporting function of _writeHTMLpages to open a page for writing
+        :param filename: file name of the page
+        :param manifest: optional NavigatorURLManifest, the page is then buffered in memory until it is saved
+        :return: fp: the open page
+        """
+        if manifest is not None: return manifest.openPage(self.__sink.path(filename))
+        return self.__sink.open(filename)
+
+    def _savedHTMLpage(self, fp, filename, manifest=None):
+        """
+        supporting function of _writeHTMLpages to close a page opened by _openHTMLpage
+        :param fp: the open page
+        :param filename: file name of the page
+        :param manifest: optional NavigatorURLManifest, the page is only written when its content changed
+        """
+        if manifest is not None: bytesWritten = manifest.closePage(fp)
+        else:
+            fp.close()
+            bytesWritten = self.__sink.size(filename)
+        if self.__stats is not None: self.__stats.count("htmlWrite", bytesWritten=bytesWritten)
+
+    def _pageFilename(self, title, pageNumber=None):
+        """
+        supporting function of _writeHTMLpages for the file name of a page
+        :param title: title of html page as string
+        :param pageNumber: optional page number, None for the single or index page
+        :return: the file name of the page
+        """
+        if pageNumber is None: return "applinksPage_" + str(title) + ".htm"
+        return "applinksPage_" + str(title) + "_" + str(pageNumber) + ".htm"
+
+    def csv2Lists(self, csvLocation, delimiter=','):
         """
         supporting function for generateHTMLpage and generates url lists from csv file
         :param csvLocation: full path to csv file
@@ -339,46 +1513,1039 @@ class NavigatorURLHyperlinks:
         :param delimiter: optional delimiter parameter
         :return: csvLists: a list of url lists [[urlStr_1, urlTitleStr_1], .... , [urlStr_N, urlTitleStr_N]]
         """
+        import csv
         csvLists = []
-        with open(str(csvLocation)) as csvFile:
-            readCSV = csv.reader(csvFile, delimiter=delimiter)
-            next(readCSV, None)
-            for row in readCSV:
-                csvLists.append(row)
-        csvFile.close()
+        with self.__stats.stage("csvRead", 0) if self.__stats is not None else _noStage:
+            with open(str(csvLocation)) as csvFile:
+                readCSV = csv.reader(csvFile, delimiter=delimiter)
+                next(readCSV, None)
+                for row in readCSV:
+                    csvLists.append(row)
+            csvFile.close()
+        if self.__stats is not None: self.__stats.count("csvRead", items=len(csvLists))
         return csvLists
 
+    def xlsx2Lists(self, xlsxLocation, sheetName=None):
+        """
+        supporting function for generateHTMLpage and generates url lists from the first (or named) sheet of an xlsx file,
+        like csv2Lists. the sheet is streamed, nothing has to be installed
+        :param xlsxLocation: full path to xlsx file
+        :param sheetName: optional name of the sheet
+        :return: xlsxLists: a list of url lists [[urlStr_1, urlTitleStr_1], .... , [urlStr_N, urlTitleStr_N]]
+        """
+        rows = _xlsxRows(xlsxLocation, sheetName)
+        next(rows, None)
+        return list(rows)
+
+
+_xlsxNamespace = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _xlsxText(element):
+    """
+    supporting function of _xlsxRows for the text of a shared or inline string (plain or rich text, phonetic runs skipped)
+    :param element: <si> or <is> element
+    :return: the string
+    """
+    text = []
+    for child in element:
+        if child.tag == _xlsxNamespace + "t": text.append(child.text or "")
+        elif child.tag == _xlsxNamespace + "r": text.extend(run.text or "" for run in child.iter(_xlsxNamespace + "t"))
+    return "".join(text)
+
+
+def _xlsxCellText(cell, sharedStrings):
+    """
+    supporting function of _xlsxRows to write a cell the way a csv export of the sheet would
+    :param cell: <c> element
+    :param sharedStrings: list of the shared strings of the workbook
+    :return: the cell as string ("" for an empty cell, numbers in their shortest form, dates as serial numbers)
+    """
+    cellType = cell.get("t")
+    if cellType == "inlineStr":
+        inline = cell.find(_xlsxNamespace + "is")
+        return _xlsxText(inline) if inline is not None else ""
+    value = cell.find(_xlsxNamespace + "v")
+    if value is None or value.text is None: return ""
+    if cellType == "s": return sharedStrings[int(value.text)]
+    if cellType == "b": return "TRUE" if value.text == "1" else "FALSE"
+    if cellType in ("str", "e"): return value.text
+    number = float(value.text)
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+def _xlsxSheetPath(archive, sheetName=None):
+    """
+    supporting function of _xlsxRows to find the part of a sheet in the xlsx archive
+    :param archive: open zipfile.ZipFile
+    :param sheetName: optional name of the sheet, None for the first sheet
+    :return: the path of the sheet xml in the archive
+    """
+    import xml.etree.ElementTree as ElementTree
+    relationships = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+    sheets = ElementTree.fromstring(archive.read("xl/workbook.xml")).iter(_xlsxNamespace + "sheet")
+    sheet = next((sheet for sheet in sheets if sheetName is None or sheet.get("name") == sheetName), None)
+    if sheet is None: raise ValueError("Sheet not found in workbook: " + str(sheetName))
+    for relationship in ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels")):
+        if relationship.get("Id") == sheet.get(relationships):
+            target = relationship.get("Target")
+            return target.lstrip("/") if target.startswith("/") else "xl/" + target
+    raise ValueError("Sheet part not found in workbook: " + str(sheet.get("name")))
+
+
+def _xlsxRows(xlsxLocation, sheetName=None, columnsFor=None):
+    """
+    supporting function of xlsx2Lists and xlsx2Rows to stream the rows of a sheet as lists of strings, header first.
+    the sheet xml is parsed incrementally with the standard library (nothing to install), only the cells of the wanted
+    columns are converted and empty rows are skipped
+    :param xlsxLocation: full path to xlsx file
+    :param sheetName: optional name of the sheet, None reads the first sheet
+    :param columnsFor: optional function of the header returning the indices of the columns to read, the other cells are left empty
+    :return: yields the header, then each row
+    """
+    import xml.etree.ElementTree as ElementTree
+    import zipfile
+    rowTag, cellTag = _xlsxNamespace + "row", _xlsxNamespace + "c"
+    with zipfile.ZipFile(str(xlsxLocation)) as archive:
+        sheetPath = _xlsxSheetPath(archive, sheetName)
+        sharedStrings = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as stringsFile:
+                for _, element in ElementTree.iterparse(stringsFile):
+                    if element.tag == _xlsxNamespace + "si":
+                        sharedStrings.append(_xlsxText(element))
+                        element.clear()
+        columnIndices = {}  # column letters -> zero based index
+        header, wanted, width = None, None, 0
+        with archive.open(sheetPath) as sheetFile:
+            for _, element in ElementTree.iterparse(sheetFile):
+                if element.tag != rowTag: continue
+                row = [""] * width if header is not None else []
+                column = -1
+                for cell in element.iter(cellTag):
+                    reference = cell.get("r")
+                    if reference is None: column += 1  # cells without reference follow the previous one
+                    else:
+                        letters = reference.rstrip("0123456789")
+                        column = columnIndices.get(letters)
+                        if column is None:
+                            column = 0
+                            for letter in letters: column = column * 26 + ord(letter) - 64
+                            column = columnIndices[letters] = column - 1
+                    if header is None:
+                        row.extend([""] * (column + 1 - len(row)))
+                        row[column] = _xlsxCellText(cell, sharedStrings)
+                    elif wanted is None or column in wanted:
+                        if column >= width: row.extend([""] * (column + 1 - len(row)))
+                        row[column] = _xlsxCellText(cell, sharedStrings)
+                element.clear()
+                if header is None:
+                    header, width = row, len(row)
+                    wanted = set(columnsFor(header)) if columnsFor is not None else None
+                    if wanted: width = max(width, max(wanted) + 1)
+                    yield header
+                elif any(row): yield row
+
+
+def _sinkName(imageDirectory, filename):
+    """
+    supporting function of the QR code and page writers for the name of an image within a sink
+    :param imageDirectory: optional directory i.e. './qrcodes/' (relative to the sink)
+    :param filename: file name with extension
+    :return: the name, with '/' separators
+    """
+    return posixpath.join(imageDirectory, filename) if imageDirectory else filename
+
+
+def _saveQRCodePNG(validURL, path, stats=None):
+    """
+    supporting function of NavigatorURLHyperlinks to save one QR code, defined at module level so worker processes can run it
+    :param validURL: valid url string
+    :param path: full path of the image
+    :param stats: optional NavigatorURLStats (inline renders only)
+    :return: qrError: None when saved, otherwise the reason it was not
+    """
+    try:
+        NavigatorURLQRCode(stats).renderQRCode(validURL, "png", path)
+    except Exception as error:
+        return str(error) or type(error).__name__
+    return None
+
+
+def _renderedQRCodeImage(validURL, imageFormat="png", stats=None):
+    """
+    supporting function of NavigatorURLHyperlinks to render one QR code in memory (for data uris and sinks without files),
+    defined at module level so worker processes can run it
+    :param validURL: valid url string
+    :param imageFormat: optional "png" (scale 10 like the saved images) or "svg" (scale 4)
+    :param stats: optional NavigatorURLStats (inline renders only)
+    :return: image, qrError: the image bytes and None when rendered, otherwise None and the reason it was not
+    """
+    try:
+        return NavigatorURLQRCode(stats).renderQRCode(validURL, imageFormat, None, scale=10 if imageFormat == "png" else 4), None
+    except Exception as error:
+        return None, str(error) or type(error).__name__
+
+
+def _renderQRCodeFile(validURL, path, imageFormat="png", scale=10, error='L', stats=None):
+    """
+    supporting function of NavigatorURLQRCodeCache to render one QR code to a path, replacing it atomically
+    :param validURL: valid url string
+    :param path: full path of the image
+    :param imageFormat: optional "png" or "svg"
+    :param scale: optional size of each QR module
+    :param error: optional QR error correction level
+    :param stats: optional NavigatorURLStats (inline renders only)
+    :return: qrError: None when saved, otherwise the reason it was not
+    """
+    partPath = path + "." + str(os.getpid()) + ".part"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        NavigatorURLQRCode(stats).renderQRCode(validURL, imageFormat, partPath, scale=scale, error=error)
+        os.replace(partPath, path)
+    except Exception as qrError:
+        if os.path.exists(partPath): os.remove(partPath)
+        return str(qrError) or type(qrError).__name__
+    return None
+
+
+def _auditURLs(urls, error='L', maxVersion=40):
+    """
+    supporting function of NavigatorURLAudit to audit a chunk of urls, defined at module level so worker processes can run it
+    :param urls: list of url strings
+    :return: reports: list of NavigatorURLScheme.auditURL reports
+    """
+    return [NavigatorURLScheme.auditURL(url, error, maxVersion) for url in urls]
+
+
+class NavigatorURLAudit:
+    """
+    generic class for auditing large corpora of existing urls in parallel, streaming a report per url
+    """
+    def __init__(self, workers=None, chunkSize=1000, error='L', maxVersion=40):
+        """
+        constructor for the url audit
+        :param workers: optional number of processes auditing concurrently (None audits inline)
+        :param chunkSize: optional number of urls sent to a worker at once
+        :param error: optional QR error correction level used for the QR length check
+        :param maxVersion: optional largest QR version (1 to 40) allowed
+        """
+        self.__workers = workers
+        self.__chunkSize = chunkSize
+        self.__error = error
+        self.__maxVersion = maxVersion
+        self.counts = collections.Counter()  # aggregate counts of the urls audited so far
+
+    def auditMany(self, urls):
+        """
+        generator of a report per url, in order, with at most a few chunks per worker in memory
+        :param urls: iterable of url strings
+        :return: yields a NavigatorURLScheme.auditURL report for each url
+        """
+        urls = iter(urls)
+        chunks = iter(lambda: list(itertools.islice(urls, self.__chunkSize)), [])
+        if not self.__workers:
+            for chunk in chunks:
+                for report in self._counted(_auditURLs(chunk, self.__error, self.__maxVersion)): yield report
+            return
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(self.__workers) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_auditURLs, chunk, self.__error, self.__maxVersion))
+                if len(pending) >= self.__workers * 2:
+                    for report in self._counted(pending.popleft().result()): yield report
+            while pending:
+                for report in self._counted(pending.popleft().result()): yield report
+
+    def auditFile(self, fileLocation, urlColumn=None, delimiter=','):
+        """
+        generator of a report per url in a file, streamed so the file can be larger than memory
+        :param fileLocation: full path to a file of urls
+        :param urlColumn: optional csv column (header name or zero based index) holding the url, None reads one url per line
+        :param delimiter: optional csv delimiter
+        :return: yields a NavigatorURLScheme.auditURL report for each url
+        """
+        import csv
+        with open(str(fileLocation), newline='') as urlFile:
+            if urlColumn is None:
+                urls = (line.strip() for line in urlFile if line.strip())
+            else:
+                readCSV = csv.reader(urlFile, delimiter=delimiter)
+                header = next(readCSV, [])
+                urlIndex = urlColumn if isinstance(urlColumn, int) else header.index(urlColumn)
+                urls = (row[urlIndex] for row in readCSV if row)
+            for report in self.auditMany(urls): yield report
+
+    def _counted(self, reports):
+        """
+        supporting function of auditMany to add reports to the aggregate counts
+        :param reports: list of reports
+        :return: reports: the same list
+        """
+        for report in reports:
+            self.counts["urls"] += 1
+            self.counts["valid"] += report["valid"]
+            self.counts["invalidScheme"] += report["invalidScheme"]
+            self.counts["tooLongForQR"] += report["tooLongForQR"]
+            for key in ("invalidKeys", "unencodedValues", "countMismatches"):
+                self.counts[key] += bool(report[key])
+        return reports
+
+
+class NavigatorURLRoutes:
+    """
+    generic class for streaming route parameter dictionaries out of stop files, one route in memory at a time
+    """
+    __recentRoutes = 10000  # route ids remembered to detect the rows of a route that are not consecutive
+
+    def __init__(self, locationColumn=4, nameColumn=5, routeColumn=None, sequenceColumn=None, parameters=None):
+        """
+        constructor for the route reader. columns are either a header name or a zero based index
+        :param locationColumn: column holding the coord/address of each row
+        :param nameColumn: optional column holding the name of each row
+        :param routeColumn: optional column holding the route id (None treats the whole file as one route)
+        :param sequenceColumn: optional column holding the order of each row within its route
+        :param parameters: optional dictionary of parameters shared by every route i.e. {"optimize": "true"}
+        """
+        self.__columns = {"location": locationColumn, "name": nameColumn, "route": routeColumn, "sequence": sequenceColumn}
+        self.__parameters = parameters if parameters is not None else {}
+
+    def csv2Routes(self, csvLocation, delimiter=',', sortedByRoute=True, chunkSize=100000):
+        """
+        generator for route parameter dictionaries from a csv file, the first row of each route is its start
+        :param csvLocation: full path to csv file (first row is the header)
+        :param delimiter: optional delimiter parameter
+        :param sortedByRoute: optional boolean, False sorts the file by route on disk before grouping
+        :param chunkSize: optional number of rows held in memory per sorted chunk when sortedByRoute is False
+        :return: yields routeId, parameterDictionary for each route in the file
+        """
+        import csv
+        with open(str(csvLocation), newline='') as csvFile:
+            for route in self.rows2Routes(csv.reader(csvFile, delimiter=delimiter), sortedByRoute, chunkSize): yield route
+
+    def xlsx2Routes(self, xlsxLocation, sheetName=None, sortedByRoute=True, chunkSize=100000):
+        """
+        generator for route parameter dictionaries from an xlsx file, the same dictionaries csv2Routes returns for the
+        sheet saved as csv. the sheet is streamed and only the cells of the mapped columns are converted
+        :param xlsxLocation: full path to xlsx file (first row is the header)
+        :param sheetName: optional name of the sheet, None reads the first sheet
+        :param sortedByRoute: optional boolean, False sorts the rows by route on disk before grouping
+        :param chunkSize: optional number of rows held in memory per sorted chunk when sortedByRoute is False
+        :return: yields routeId, parameterDictionary for each route in the sheet
+        """
+        for route in self.rows2Routes(self.xlsx2Rows(xlsxLocation, sheetName), sortedByRoute, chunkSize): yield route
+
+    def xlsx2Rows(self, xlsxLocation, sheetName=None):
+        """
+        generator for the rows of an xlsx file with only the mapped columns converted (the other cells are empty strings)
+        :param xlsxLocation: full path to xlsx file (first row is the header)
+        :param sheetName: optional name of the sheet, None reads the first sheet
+        :return: yields the header, then each row as a list of strings
+        """
+        columnsFor = lambda header: [index for index in self._columnIndices(header).values() if index is not None]
+        for row in _xlsxRows(xlsxLocation, sheetName, columnsFor): yield row
+
+    def rows2Routes(self, rows, sortedByRoute=True, chunkSize=100000):
+        """
+        generator for route parameter dictionaries from rows of any source (csv reader, spreadsheet, database cursor)
+        :param rows: iterable of rows as lists of strings, the first row is the header. a row may leave out the name
+                     cell, a row too short for the other mapped columns raises ValueError
+        :param sortedByRoute: optional boolean, False sorts the rows by route on disk before grouping
+        :param chunkSize: optional number of rows held in memory per sorted chunk when sortedByRoute is False
+        :return: yields routeId, parameterDictionary for each route
+        """
+        rows = iter(rows)
+        indices = self._columnIndices(next(rows, []))
+        rows = self._checkedRows(rows, indices)
+        if not sortedByRoute and indices["route"] is not None: rows = self._externalSort(rows, indices["route"], chunkSize)
+        for route in self._groupRoutes(rows, indices): yield route
+
+    def _columnIndices(self, header):
+        """
+        supporting function of csv2Routes to resolve the column mapping against the header row
+        :param header: list of column names
+        :return: indices: dictionary of column indices (None for unmapped columns)
+        """
+        indices = {}
+        for key, column in self.__columns.items():
+            if column is None or isinstance(column, int): indices[key] = column
+            elif column in header: indices[key] = header.index(column)
+            else: raise ValueError("Column not found in header: " + str(column))
+        return indices
+
+    def _checkedRows(self, rows, indices):
+        """
+        supporting function of rows2Routes to skip blank rows and reject the rows missing a required column
+        :param rows: iterable of rows after the header
+        :param indices: dictionary of column indices
+        :return: yields each non blank row
+        """
+        required = [index for key, index in indices.items() if key != "name" and index is not None]
+        columnCount = max(required) + 1 if required else 0
+        for rowNumber, row in enumerate(rows, 2):  # the header is row 1
+            if not row: continue
+            if len(row) < columnCount:
+                raise ValueError("Row " + str(rowNumber) + " has " + str(len(row)) + " columns, the mapped columns need " + str(columnCount))
+            yield row
+
+    def _groupRoutes(self, rows, indices):
+        """
+        supporting function of csv2Routes to group consecutive rows with the same route id into parameter dictionaries.
+        only the last __recentRoutes route ids are remembered: rows of a route further apart than that are yielded as
+        separate routes instead of raising, use sortedByRoute=False when the rows are not grouped by route
+        :param rows: iterable of rows ordered by route
+        :param indices: dictionary of column indices
+        :return: yields routeId, parameterDictionary for each route
+        """
+        routeIndex = indices["route"]
+        recentRoutes = collections.OrderedDict()
+        for routeId, routeRows in itertools.groupby(rows, key=lambda row: row[routeIndex] if routeIndex is not None else None):
+            if routeId in recentRoutes:
+                raise ValueError("Rows for route " + str(routeId) + " are not consecutive, use sortedByRoute=False")
+            recentRoutes[routeId] = None
+            if len(recentRoutes) > self.__recentRoutes: recentRoutes.popitem(last=False)
+            yield routeId, self._routeParameters(list(routeRows), indices)
+
+    def _routeParameters(self, routeRows, indices):
+        """
+        supporting function of csv2Routes to build the parameter dictionary of a single route
+        :param routeRows: list of rows belonging to one route
+        :param indices: dictionary of column indices
+        :return: parameterDictionary: {"start": [...], "stops": [[...], ...], ...}
+        """
+        locationIndex, nameIndex, sequenceIndex = indices["location"], indices["name"], indices["sequence"]
+        if sequenceIndex is not None: routeRows.sort(key=lambda row: float(row[sequenceIndex]))
+        locations = []
+        for row in routeRows:
+            location = [row[locationIndex]]
+            if nameIndex is not None and nameIndex < len(row) and row[nameIndex]: location.append(row[nameIndex])
+            locations.append(location)
+        parameterDictionary = dict(self.__parameters)
+        parameterDictionary["start"] = locations[0]
+        if len(locations) > 1: parameterDictionary["stops"] = locations[1:]
+        return parameterDictionary
+
+    def _externalSort(self, rows, routeIndex, chunkSize):
+        """
+        supporting function of csv2Routes to order rows by route using sorted chunk files merged from disk
+        :param rows: iterable of rows in any order
+        :param routeIndex: index of the route id column
+        :param chunkSize: number of rows sorted in memory at once
+        :return: yields rows ordered by route (rows of a route keep their file order)
+        """
+        import csv, heapq, tempfile
+        routeKey = lambda row: row[routeIndex]
+        with tempfile.TemporaryDirectory() as chunkDirectory:
+            chunkFiles = []
+            try:
+                for chunkCount, chunkRows in enumerate(iter(lambda: list(itertools.islice(rows, chunkSize)), [])):
+                    chunkRows.sort(key=routeKey)
+                    chunkFile = open(os.path.join(chunkDirectory, "chunk_" + str(chunkCount) + ".csv"), 'w+', newline='')
+                    chunkFiles.append(chunkFile)
+                    csv.writer(chunkFile).writerows(chunkRows)
+                    chunkFile.seek(0)
+                for row in heapq.merge(*[csv.reader(chunkFile) for chunkFile in chunkFiles], key=routeKey): yield row
+            finally:
+                for chunkFile in chunkFiles: chunkFile.close()
+
+
+class NavigatorURLPyQRCodeBackend:
+    """
+    generic QR backend encoding and rendering the images with pyqrcode
+    """
+    def encode(self, validURL, error='L', version=None):
+        """
+        encodes a url
+        :param validURL: valid url string
+        :param error: optional QR error correction level 'L', 'M', 'Q' or 'H'
+        :param version: optional QR version, None picks the smallest that fits
+        :return: the encoded QR code, its module matrix is '.code' (rows of 1 for dark and 0 for light modules)
+        """
+        import pyqrcode
+        return pyqrcode.create(validURL, error=error, version=version)
+
+    def render(self, encoded, imageFormat, target, scale):
+        """
+        renders an encoded QR code with a 4 module quiet zone, black on white
+        :param encoded: QR code returned by encode
+        :param imageFormat: "png" or "svg"
+        :param target: file path or writable binary file object
+        :param scale: size of each QR module
+        """
+        getattr(encoded, imageFormat)(target, scale=scale)
+
+
+class NavigatorURLNumPyQRCodeBackend(NavigatorURLPyQRCodeBackend):
+    """
+    generic QR backend rasterizing the PNGs with numpy: the module matrix is scaled with array repeats, packed to 1 bit
+    greyscale rows and written as a single zlib stream, the same pixels pyqrcode writes row by row in python.
+    encoding and SVGs are left to pyqrcode
+    """
+    __pngSignature = b"\x89PNG\r\n\x1a\n"
+
+    def __init__(self):
+        """
+        constructor for the numpy backend
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The numpy QR backend requires numpy (pip install numpy)")
+        self.__numpy = numpy
+
+    def render(self, encoded, imageFormat, target, scale):
+        if imageFormat != "png": return NavigatorURLPyQRCodeBackend.render(self, encoded, imageFormat, target, scale)
+        image = self.png(encoded.code, scale)
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, 'wb') as imageFile: imageFile.write(image)
+        else: target.write(image)
+
+    def png(self, code, scale=10, quietZone=4):
+        """
+        rasterizes a module matrix
+        :param code: rows of 1 for dark and 0 for light modules
+        :param scale: optional size of each module in pixels
+        :param quietZone: optional number of light modules around the code
+        :return: the PNG bytes (1 bit greyscale, dark modules black)
+        """
+        import struct, zlib
+        numpy = self.__numpy
+        scale = int(scale)
+        modules = numpy.asarray(code, dtype=numpy.uint8)
+        light = numpy.ones((modules.shape[0] + 2 * quietZone, modules.shape[1] + 2 * quietZone), dtype=bool)
+        light[quietZone:quietZone + modules.shape[0], quietZone:quietZone + modules.shape[1]] = modules == 0
+        packedRows = numpy.packbits(numpy.repeat(light, scale, axis=1), axis=1)
+        scanlines = numpy.zeros((packedRows.shape[0], packedRows.shape[1] + 1), dtype=numpy.uint8)  # filter byte 0 (none) per row
+        scanlines[:, 1:] = packedRows
+        imageData = zlib.compress(numpy.repeat(scanlines, scale, axis=0).tobytes())
+        width, height = light.shape[1] * scale, light.shape[0] * scale
+
+        def chunk(chunkType, data):
+            return struct.pack(">I", len(data)) + chunkType + data + struct.pack(">I", zlib.crc32(chunkType + data) & 0xffffffff)
+        return (self.__pngSignature + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)) +
+                chunk(b"IDAT", imageData) + chunk(b"IEND", b""))
+
+
+def _defaultQRBackend():
+    """
+    supporting function of NavigatorURLQRCode for the backend used when none is given
+    :return: a NavigatorURLNumPyQRCodeBackend when numpy is installed, otherwise a NavigatorURLPyQRCodeBackend
+    """
+    global _qrBackend
+    if _qrBackend is None:
+        import importlib.util
+        _qrBackend = NavigatorURLNumPyQRCodeBackend() if importlib.util.find_spec("numpy") is not None else NavigatorURLPyQRCodeBackend()
+    return _qrBackend
+
+
+_qrBackend = None  # shared default backend, created on first use
+
 
 class NavigatorURLQRCode:
     """
     generic class for making QR codes for app-links
     """
-    def __init__(self):
-        pass
+    # byte mode capacity of QR versions 1 to 40 per error correction level
+    __byteCapacities = {
+        "L": (17, 32, 53, 78, 106, 134, 154, 192, 230, 271, 321, 367, 425, 458, 520, 586, 644, 718, 792, 858,
+              929, 1003, 1091, 1171, 1273, 1367, 1465, 1528, 1628, 1732, 1840, 1952, 2068, 2188, 2303, 2431, 2563, 2699, 2809, 2953),
+        "M": (14, 26, 42, 62, 84, 106, 122, 152, 180, 213, 251, 287, 331, 362, 412, 450, 504, 560, 624, 666,
+              711, 779, 857, 911, 997, 1059, 1125, 1190, 1264, 1370, 1452, 1538, 1628, 1722, 1809, 1911, 1989, 2099, 2213, 2331),
+        "Q": (11, 20, 32, 46, 60, 74, 86, 108, 130, 151, 177, 203, 241, 258, 292, 322, 364, 394, 442, 482,
+              509, 565, 611, 661, 715, 751, 805, 868, 908, 982, 1030, 1112, 1168, 1228, 1283, 1351, 1423, 1499, 1579, 1663),
+        "H": (7, 14, 24, 34, 44, 58, 64, 84, 98, 119, 137, 155, 177, 194, 220, 250, 280, 310, 338, 382,
+              403, 439, 461, 511, 535, 593, 625, 658, 698, 742, 790, 842, 898, 958, 983, 1051, 1093, 1139, 1219, 1273),
+    }
+    def __init__(self, stats=None, sink=None, backend=None):
+        """
+        constructor for the QR code tools
+        :param stats: optional NavigatorURLStats recording the qrEncode, pngRender/svgRender, qrSave and qrCache stages
+        :param sink: optional output sink saveQRCodeSVG and saveQRCodePNG write to, None writes files relative to the working directory
+        :param backend: optional QR backend encoding and rendering the images (NavigatorURLPyQRCodeBackend or
+                        NavigatorURLNumPyQRCodeBackend), None uses the numpy backend when numpy is installed
+        """
+        self.__stats = stats
+        self.__sink = sink if sink is not None else NavigatorURLDirectorySink()
+        self.__backend = backend  # the default is picked on first render, so the url-only checks do not import numpy
 
     def returnQRCodeText(self, validURL):
+        import pyqrcode
         objectQRCode = pyqrcode.create(validURL)
         return objectQRCode.text()
 
-    def saveQRCodeSVG(self, validURL, filename, imageDirectory=None):
-        fullfilename = imageDirectory + filename if imageDirectory is not None else filename
-        objectQRCode = pyqrcode.create(validURL)
-        objectQRCode.svg(fullfilename + ".svg", scale=4)
-        # in-memory stream is also supported
-        buffer = io.BytesIO()
-        objectQRCode.svg(buffer)
-        # do whatever you want with buffer.getvalue()
-        print(list(buffer.getvalue()))
-
-    def saveQRCodePNG(self, validURL, filename, imageDirectory=None):
-        fullfilename = imageDirectory + filename if imageDirectory is not None else filename
-        objectQRCode = pyqrcode.create(validURL, error='L')
-        with open(fullfilename + ".png", 'wb') as fstream:
-            objectQRCode.png(fstream, scale=10)
-        # same as above
-        objectQRCode.png(fullfilename + ".png", scale=10)
-        # in-memory stream is also supported
-        buffer = io.BytesIO()
-        objectQRCode.png(buffer)
-        # do whatever you want with buffer.getvalue()
-        print(list(buffer.getvalue()))
+    def qrCapacity(self, error='L', maxVersion=40):
+        """
+        maximum number of bytes a QR code can hold
+        :param error: optional QR error correction level 'L', 'M', 'Q' or 'H'
+        :param maxVersion: optional largest QR version (1 to 40) allowed
+        :return: capacity in bytes
+        """
+        return self.__byteCapacities[str(error).upper()][maxVersion - 1]
+
+    def qrVersion(self, validURL, error='L', maxVersion=40):
+        """
+        predicts the smallest QR version that holds the url without encoding it
+        :param validURL: valid url string
+        :param error: optional QR error correction level 'L', 'M', 'Q' or 'H'
+        :param maxVersion: optional largest QR version (1 to 40) allowed
+        :return: version or None when the url does not fit in maxVersion
+        """
+        capacities = self.__byteCapacities[str(error).upper()]
+        version = bisect.bisect_left(capacities, len(str(validURL).encode("utf-8"))) + 1
+        return version if version <= maxVersion else None
+
+    def generateQRLegs(self, parameterDictionary, error='L', maxVersion=40):
+        """
+        builds the urls of a route, split into consecutive legs when it does not fit in one QR code
+        :param parameterDictionary: the dictionary of key/value pairs to be used when building url, see NavigatorURLScheme
+        :param error: optional QR error correction level 'L', 'M', 'Q' or 'H'
+        :param maxVersion: optional largest QR version (1 to 40) allowed
+        :return: legs: list of urls that each fit in a QR code
+        """
+        return NavigatorURLScheme(parameterDictionary).generateLegs(self.qrCapacity(error, maxVersion))
+
+    def renderQRCode(self, validURL, imageFormat="png", target=None, scale=10, error='L'):
+        """
+        encodes the url once and renders it to exactly one target
+        :param validURL: valid url string
+        :param imageFormat: optional "png" or "svg"
+        :param target: optional file path or writable binary file object, None returns the image as bytes
+        :param scale: optional size of each QR module in pixels
+        :param error: optional QR error correction level 'L', 'M', 'Q' or 'H'
+        :return: the image bytes when no target is given, otherwise None
+        """
+        if imageFormat not in ("png", "svg"): raise ValueError("Invalid QR code image format entered: " + str(imageFormat))
+        version = self.qrVersion(validURL, error)
+        if version is None:
+            raise ValueError("The url is too long for a QR code (" + str(len(str(validURL).encode("utf-8"))) + " bytes, at most " +
+                             str(self.qrCapacity(error)) + " at error level " + str(error) + ")")
+        import io
+        buffer = io.BytesIO() if target is None else None
+        backend = self.__backend if self.__backend is not None else _defaultQRBackend()
+        if self.__stats is None:
+            backend.render(backend.encode(validURL, error, version), imageFormat, buffer if buffer is not None else target, scale)
+            return buffer.getvalue() if buffer is not None else None
+        with self.__stats.stage("qrEncode"): encoded = backend.encode(validURL, error, version)
+        with self.__stats.stage(imageFormat + "Render"): backend.render(encoded, imageFormat, buffer if buffer is not None else target, scale)
+        if buffer is not None: bytesWritten = len(buffer.getvalue())
+        elif isinstance(target, str): bytesWritten = os.path.getsize(target)
+        else: bytesWritten = 0  # file objects are left where the caller put them
+        self.__stats.count(imageFormat + "Render", bytesWritten=bytesWritten)
+        return buffer.getvalue() if buffer is not None else None
+
+    def saveQRCodeSVG(self, validURL, filename, imageDirectory=None, scale=4, error='H', cache=None):
+        """
+        saves the QR code of a url as <imageDirectory>/<filename>.svg in the sink
+        :param validURL: valid url string
+        :param filename: file name without extension
+        :param imageDirectory: optional directory prefix i.e. './qrcodes/'
+        :param scale: optional size of each QR module
+        :param error: optional QR error correction level
+        :param cache: optional NavigatorURLQRCodeCache, identical codes are then rendered once and copied (sinks writing files only)
+        """
+        self._savedQRCode(validURL, _sinkName(imageDirectory, filename + ".svg"), "svg", scale, error, cache)
+
+    def saveQRCodePNG(self, validURL, filename, imageDirectory=None, scale=10, error='L', cache=None):
+        """
+        saves the QR code of a url as <imageDirectory>/<filename>.png in the sink
+        :param validURL: valid url string
+        :param filename: file name without extension
+        :param imageDirectory: optional directory prefix i.e. './qrcodes/'
+        :param scale: optional size of each QR module in pixels
+        :param error: optional QR error correction level
+        :param cache: optional NavigatorURLQRCodeCache, identical codes are then rendered once and copied (sinks writing files only)
+        """
+        self._savedQRCode(validURL, _sinkName(imageDirectory, filename + ".png"), "png", scale, error, cache)
+
+    def _savedQRCode(self, validURL, name, imageFormat, scale, error, cache=None):
+        """
+        supporting function of saveQRCodeSVG and saveQRCodePNG to save a QR code to the sink
+        :param name: name of the image within the sink
+        :param cache: optional NavigatorURLQRCodeCache
+        """
+        path = self.__sink.path(name)
+        if path is None:
+            if cache is not None: raise ValueError("A QR code cache needs a sink writing files (NavigatorURLDirectorySink)")
+            return self.__sink.write(name, self.renderQRCode(validURL, imageFormat, None, scale=scale, error=error))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if cache is not None: self._cachedQRCode(cache, validURL, path, imageFormat, scale, error)
+        else: self.renderQRCode(validURL, imageFormat, path, scale=scale, error=error)
+
+    def _cachedQRCode(self, cache, validURL, targetPath, imageFormat, scale, error):
+        """
+        supporting function of saveQRCodeSVG and saveQRCodePNG to save a QR code through a NavigatorURLQRCodeCache
+        :param cache: NavigatorURLQRCodeCache
+        :param targetPath: full path of the image to write
+        """
+        if self.__stats is None: return cache.saveQRCode(validURL, targetPath, imageFormat, scale=scale, error=error)
+        hits = cache.hits
+        with self.__stats.stage("qrSave"): cache.saveQRCode(validURL, targetPath, imageFormat, scale=scale, error=error)
+        self.__stats.count("qrCache", hits=cache.hits - hits, misses=1 - (cache.hits - hits))
+
+
+class NavigatorURLQRCodeCache:
+    """
+    generic class for an on-disk cache of QR code images keyed by a hash of (url, format, scale, error level).
+    the least recently used images are evicted once the cache grows past its size limit
+    """
+    def __init__(self, cacheDirectory, maxBytes=1 << 30):
+        """
+        constructor for the QR code cache, indexes the images already in cacheDirectory
+        :param cacheDirectory: directory holding the cached images (created if missing)
+        :param maxBytes: optional size limit of the cache in bytes
+        """
+        self.__cacheDirectory = str(cacheDirectory)
+        self.__maxBytes = maxBytes
+        self.__entries = collections.OrderedDict()  # cache path -> size in bytes, least recently used first
+        self.__totalBytes = 0
+        self.hits, self.misses = 0, 0
+        os.makedirs(self.__cacheDirectory, exist_ok=True)
+        cached = []
+        for subdirectory in os.scandir(self.__cacheDirectory):
+            if not subdirectory.is_dir(): continue
+            for entry in os.scandir(subdirectory.path):
+                if entry.is_file() and not entry.name.endswith(".part"):
+                    status = entry.stat()
+                    cached.append((status.st_mtime, entry.path, status.st_size))
+        for _, path, size in sorted(cached):
+            self.__entries[path] = size
+            self.__totalBytes += size
+
+    def cachePath(self, validURL, imageFormat="png", scale=10, error='L'):
+        """
+        content address of a QR code image
+        :param validURL: valid url string
+        :param imageFormat: optional "png" or "svg"
+        :param scale: optional size of each QR module
+        :param error: optional QR error correction level
+        :return: the path the image is cached at
+        """
+        import hashlib
+        key = hashlib.sha256("\n".join([str(validURL), imageFormat, str(scale), error]).encode("utf-8")).hexdigest()
+        return os.path.join(self.__cacheDirectory, key[:2], key + "." + imageFormat)
+
+    def copyTo(self, cachePath, targetPath, isLookup=True):
+        """
+        copies a cached image to targetPath and marks it recently used (not hardlinked, an uncached build writing
+        targetPath later would change the cached image through the shared inode)
+        :param cachePath: path returned by cachePath
+        :param targetPath: full path of the image to write
+        :param isLookup: optional boolean, False does not count the call as a hit or miss (copy of a fresh render)
+        :return: True when the image was cached and copied, False otherwise
+        """
+        copied = cachePath in self.__entries
+        if copied:
+            try:
+                os.utime(cachePath)
+                import shutil
+                shutil.copyfile(cachePath, targetPath)
+                self.__entries.move_to_end(cachePath)
+            except FileNotFoundError:
+                # removed from disk behind our back
+                self.__totalBytes -= self.__entries.pop(cachePath)
+                copied = False
+        if isLookup:
+            if copied: self.hits += 1
+            else: self.misses += 1
+        return copied
+
+    def added(self, cachePath):
+        """
+        records an image rendered into cachePath and evicts the least recently used images over the size limit
+        :param cachePath: path returned by cachePath
+        """
+        if cachePath in self.__entries: self.__totalBytes -= self.__entries.pop(cachePath)
+        self.__entries[cachePath] = os.path.getsize(cachePath)
+        self.__totalBytes += self.__entries[cachePath]
+        while self.__totalBytes > self.__maxBytes and len(self.__entries) > 1:
+            evictedPath, size = self.__entries.popitem(last=False)
+            self.__totalBytes -= size
+            if os.path.exists(evictedPath): os.remove(evictedPath)
+
+    def saveQRCode(self, validURL, targetPath, imageFormat="png", scale=10, error='L'):
+        """
+        saves the QR code of a url to targetPath, rendering it only when it is not cached
+        :param validURL: valid url string
+        :param targetPath: full path of the image to write
+        :param imageFormat: optional "png" or "svg"
+        :param scale: optional size of each QR module
+        :param error: optional QR error correction level
+        """
+        cachePath = self.cachePath(validURL, imageFormat, scale, error)
+        if self.copyTo(cachePath, targetPath): return
+        qrError = _renderQRCodeFile(validURL, cachePath, imageFormat, scale, error)
+        if qrError is not None: raise ValueError(qrError)
+        self.added(cachePath)
+        self.copyTo(cachePath, targetPath, isLookup=False)
+
+
+class NavigatorURLManifest:
+    """
+    generic class for a manifest of the content hash of each page and QR code image written by the html pages, so that a
+    rebuild only renders and writes the artifacts whose content changed and removes the ones no longer generated
+    """
+    def __init__(self, manifestLocation):
+        """
+        constructor for the manifest, loads the manifest of the last build when there is one
+        :param manifestLocation: full path to the json manifest (written by finish)
+        """
+        self.__manifestLocation = str(manifestLocation)
+        self.__previous = {}  # artifact path -> content hash of the last build
+        self.__current = {}  # artifact path -> content hash of this build
+        self.counts = collections.Counter()  # unchanged, changed and removed artifacts of this build
+        if os.path.exists(self.__manifestLocation):
+            import json
+            with open(self.__manifestLocation) as manifestFile: self.__previous = json.load(manifestFile)["artifacts"]
+
+    def contentHash(self, *parts):
+        """
+        content hash of the inputs of an artifact
+        :param parts: strings (or values converted with str) the artifact is generated from
+        :return: hex digest
+        """
+        import hashlib
+        return hashlib.sha256("\n".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def unchanged(self, path, contentHash):
+        """
+        checks whether an artifact of the last build is still on disk with the same content hash
+        :param path: path of the artifact
+        :param contentHash: content hash of this build
+        :return: True when the artifact can be kept as it is
+        """
+        isUnchanged = self.__previous.get(path) == contentHash and os.path.exists(path)
+        self.counts["unchanged" if isUnchanged else "changed"] += 1
+        return isUnchanged
+
+    def record(self, path, contentHash):
+        """
+        records an artifact written (or kept) by this build
+        :param path: path of the artifact
+        :param contentHash: its content hash
+        """
+        self.__current[path] = contentHash
+
+    def openPage(self, path):
+        """
+        opens an in-memory page, written to path by closePage only when its content changed
+        :param path: path of the page
+        :return: fp: the page buffer
+        """
+        import io
+        fp = io.StringIO()
+        fp.name = path
+        return fp
+
+    def closePage(self, fp):
+        """
+        records a page opened by openPage and writes it when it changed
+        :param fp: the page buffer
+        :return: bytesWritten: size of the written page, 0 when unchanged
+        """
+        content = fp.getvalue()
+        contentHash = self.contentHash(content)
+        self.record(fp.name, contentHash)
+        if self.unchanged(fp.name, contentHash): return 0
+        with open(fp.name + ".part", 'w') as pageFile: pageFile.write(content)
+        os.replace(fp.name + ".part", fp.name)
+        return os.path.getsize(fp.name)
+
+    def finish(self):
+        """
+        removes the artifacts of the last build that this build did not record and saves the manifest of this build
+        :return: removed: list of paths of the removed artifacts
+        """
+        import json
+        removed = [path for path in self.__previous if path not in self.__current]
+        for path in removed:
+            if os.path.exists(path): os.remove(path)
+        self.counts["removed"] += len(removed)
+        with open(self.__manifestLocation + ".part", 'w') as manifestFile:
+            json.dump({"artifacts": self.__current}, manifestFile, indent=0, sort_keys=True)
+        os.replace(self.__manifestLocation + ".part", self.__manifestLocation)
+        self.__previous, self.__current = self.__current, {}
+        return removed
+
+
+class _SinkBuffer:
+    """
+    in-memory file handed out by the memory and archive sinks, its content is passed to the sink once closed
+    """
+    def __init__(self, name, binary, onClose):
+        """
+        constructor for the buffer
+        :param name: name of the file within the sink
+        :param binary: boolean, False buffers str written as utf-8
+        :param onClose: function called with name and the content bytes when the buffer is closed
+        """
+        self.name = name
+        self.__binary = binary
+        self.__parts = []
+        self.__onClose = onClose
+
+    def write(self, data):
+        self.__parts.append(data)
+        return len(data)
+
+    def close(self):
+        if self.__parts is None: return
+        data = b"".join(self.__parts) if self.__binary else "".join(self.__parts).encode("utf-8")
+        self.__parts = None
+        self.__onClose(self.name, data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exceptionInfo):
+        self.close()
+
+
+def _archiveName(name):
+    """
+    supporting function of the memory and archive sinks for the normalized member name of a file
+    :param name: name as passed to the sink i.e. './qrcodes/a.png'
+    :return: the member name i.e. 'qrcodes/a.png'
+    """
+    return posixpath.normpath(str(name).replace(os.sep, "/")).lstrip("/")
+
+
+class NavigatorURLDirectorySink:
+    """
+    generic class for an output sink writing each page and QR code image as a file under a directory (the default sink)
+    """
+    __bufferSize = 1 << 16  # bytes buffered before each write to a file
+
+    def __init__(self, directory="."):
+        """
+        constructor for the directory sink
+        :param directory: optional directory the names are relative to
+        """
+        self.__directory = str(directory)
+
+    def path(self, name):
+        """
+        file system path of a name, sinks without files return None
+        :param name: name of the file within the sink
+        :return: the path
+        """
+        return os.path.join(self.__directory, name)
+
+    def open(self, name, binary=False):
+        """
+        opens a file for writing, creating its directory when missing
+        :param name: name of the file within the sink
+        :param binary: optional boolean, True for bytes
+        :return: fp: the open file, complete once closed
+        """
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return open(path, 'wb' if binary else 'w', buffering=self.__bufferSize)
+
+    def write(self, name, data):
+        """
+        writes a whole file
+        :param name: name of the file within the sink
+        :param data: bytes or str
+        """
+        with self.open(name, isinstance(data, bytes)) as fp: fp.write(data)
+
+    def size(self, name):
+        """
+        :param name: name of a file written to the sink
+        :return: its size in bytes
+        """
+        return os.path.getsize(self.path(name))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exceptionInfo):
+        self.close()
+
+
+class NavigatorURLMemorySink(NavigatorURLDirectorySink):
+    """
+    generic class for an output sink keeping each page and QR code image in memory, in '.files' (name -> bytes)
+    """
+    def __init__(self):
+        """
+        constructor for the memory sink
+        """
+        self.files = {}
+
+    def path(self, name):
+        return None
+
+    def open(self, name, binary=False):
+        return _SinkBuffer(_archiveName(name), binary, self.files.__setitem__)
+
+    def write(self, name, data):
+        self.files[_archiveName(name)] = data if isinstance(data, bytes) else data.encode("utf-8")
+
+    def size(self, name):
+        return len(self.files[_archiveName(name)])
+
+
+class NavigatorURLArchiveSink(NavigatorURLDirectorySink):
+    """
+    generic class for an output sink streaming each page and QR code image into a single zip or tar archive. the members
+    are appended sequentially through one large buffer (the stream need not be seekable) instead of creating a file each,
+    call close (or use the sink as a context manager) to finish the archive
+    """
+    def __init__(self, archive, archiveFormat=None, compress=False, bufferSize=1 << 20):
+        """
+        constructor for the archive sink
+        :param archive: path of the archive or writable binary file object i.e. sys.stdout.buffer
+        :param archiveFormat: optional "zip" or "tar", None guesses from the path (.zip, .tar, .tar.gz/.tgz) and uses zip for file objects
+        :param compress: optional boolean to deflate (zip) or gzip (tar) the members, QR code PNGs are already compressed
+        :param bufferSize: optional size in bytes of the write buffer of an archive opened by path
+        """
+        isPath = isinstance(archive, (str, os.PathLike))
+        name = str(archive).lower() if isPath else ""
+        if archiveFormat is None: archiveFormat = "tar" if name.endswith((".tar", ".tar.gz", ".tgz")) else "zip"
+        if archiveFormat not in ("zip", "tar"): raise ValueError("Invalid archive format entered: " + str(archiveFormat))
+        compress = compress or name.endswith((".tar.gz", ".tgz"))
+        self.__file = open(archive, 'wb', buffering=bufferSize) if isPath else None
+        self.__sizes = {}
+        self.__zip, self.__tar = None, None
+        if archiveFormat == "zip":
+            import zipfile
+            self.__zip = zipfile.ZipFile(self.__file or archive, 'w', zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+        else:
+            import tarfile
+            self.__tar = tarfile.open(fileobj=self.__file or archive, mode="w|gz" if compress else "w|")
+
+    def path(self, name):
+        return None
+
+    def open(self, name, binary=False):
+        return _SinkBuffer(name, binary, self.write)
+
+    def write(self, name, data):
+        name = _archiveName(name)
+        if not isinstance(data, bytes): data = data.encode("utf-8")
+        if self.__zip is not None: self.__zip.writestr(name, data)
+        else:
+            import io, tarfile
+            member = tarfile.TarInfo(name)
+            member.size, member.mtime = len(data), time.time()
+            self.__tar.addfile(member, io.BytesIO(data))
+        self.__sizes[name] = len(data)
+
+    def size(self, name):
+        return self.__sizes[_archiveName(name)]
+
+    def close(self):
+        """
+        finishes the archive (and closes it when it was opened by path)
+        """
+        if self.__zip is not None: self.__zip.close()
+        if self.__tar is not None: self.__tar.close()
+        self.__zip, self.__tar = None, None
+        if self.__file is not None: self.__file.close()
+        self.__file = None
+
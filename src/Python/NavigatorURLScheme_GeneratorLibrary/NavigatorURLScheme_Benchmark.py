@@ -0,0 +1,505 @@
+"""
+COPYRIGHT 2016 ESRI
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import argparse
+import collections
+import contextlib
+import csv
+import datetime
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from NavigatorURLScheme import NavigatorURLScheme, NavigatorURLEncodingCache, NavigatorURLHyperlinks, NavigatorURLQRCode, NavigatorURLStopOrder, NavigatorURLStops, NavigatorURLRoutes, \
+    NavigatorURLPyQRCodeBackend, NavigatorURLNumPyQRCodeBackend, NavigatorURLCSVGeocoder, NavigatorURLAddressCache
+
+'''
+Benchmarks for the NavigatorURLScheme library -- run from this directory with
+  'python NavigatorURLScheme_Benchmark.py run --output results.json'  (add '--size full' for 1 to 10k stops, 10 to 1M routes)
+  'python NavigatorURLScheme_Benchmark.py compare baseline.json results.json'  (exits 1 when a benchmark regressed)
+  'python NavigatorURLScheme_Benchmark.py targets'  (checks the throughput targets below)
+'''
+
+# throughput targets (urls/sec, or speedups measured against the per-object path in the same run)
+batchSpeedupTarget = 1.2  # generateMany over NavigatorURLScheme(parameterDictionary).generateURL() per route
+parseThroughputTarget = 30000
+encodingCacheSpeedupTarget = 2.0  # routes over a small set of repeated addresses
+importTimeBudget = 0.020  # seconds, cumulative 'python -X importtime' of the library with its bytecode cached
+lazyModules = ("pyqrcode", "png", "concurrent.futures", "csv", "hashlib", "heapq", "shutil", "tempfile")  # not needed to build urls
+
+# synthetic datasets -- every combination of routes and stops per route up to maxStops stops in total
+datasetSizes = {
+    "quick": {"routes": (10, 1000), "stops": (1, 10, 100), "maxStops": 100000, "maxQRCodes": 20},
+    "full": {"routes": (10, 1000, 100000, 1000000), "stops": (1, 10, 100, 1000, 10000), "maxStops": 10000000, "maxQRCodes": 500},
+}
+distinctRoutesPerDataset = 1000  # larger datasets cycle through this many distinct routes to bound memory
+orderedStopsPerDataset = 100000  # stops ordered by the orderStops benchmark of each dataset
+
+
+def syntheticParameterDictionaries(routeCount, stopsPerRoute, seed=0, addressShare=0.5):
+    """
+    builds a list of synthetic routes shaped like a fleet export
+    :param routeCount: number of parameter dictionaries to build
+    :param stopsPerRoute: number of stops in each route
+    :param seed: optional seed, the same arguments always build the same routes
+    :param addressShare: optional share of stops given as an address instead of coordinates
+    :return: parameterDictionaries: list of parameter dictionaries
+    """
+    generator = random.Random(seed)
+    parameterDictionaries = []
+    for route in range(routeCount):
+        stops = []
+        for stop in range(stopsPerRoute):
+            if generator.random() < 1 - addressShare: location = "{:.6f},{:.6f}".format(generator.uniform(43.5, 43.8), generator.uniform(-70.4, -70.1))
+            else: location = "{} {} St, Portland, ME, 04101".format(generator.randint(1, 999), generator.choice(("Congress", "Commercial", "Fore", "Exchange")))
+            stops.append([location, "Stop " + str(stop)])
+        parameterDictionaries.append({"start": ["43.633332,-70.259971", "Depot"], "stops": stops,
+                                      "optimize": "true", "navigate": "true"})
+    return parameterDictionaries
+
+
+def datasets(size):
+    """
+    the (routes, stops per route) combinations of a dataset size
+    :param size: "quick" or "full"
+    :return: list of (routeCount, stopsPerRoute)
+    """
+    sizes = datasetSizes[size]
+    return [(routeCount, stopsPerRoute) for stopsPerRoute in sizes["stops"] for routeCount in sizes["routes"]
+            if routeCount * stopsPerRoute <= sizes["maxStops"]]
+
+
+def cycled(items, count):
+    """
+    repeats a list of items up to count items
+    :param items: list of items
+    :param count: number of items wanted
+    :return: iterator of count items
+    """
+    return itertools.islice(itertools.cycle(items), count)
+
+
+def timed(function, items, repeat):
+    """
+    best of repeat timings of function
+    :param function: callable running the benchmark once
+    :param items: number of items processed by one call
+    :param repeat: number of calls
+    :return: result: {"items", "seconds", "itemsPerSecond"}
+    """
+    seconds = None
+    for _ in range(repeat):
+        startTime = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - startTime
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    return {"items": items, "seconds": seconds, "itemsPerSecond": items / seconds if seconds else float("inf")}
+
+
+@contextlib.contextmanager
+def quietDirectory():
+    """
+    runs the body in a temporary working directory with library printing silenced
+    """
+    previousDirectory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(directory)
+        try: yield directory
+        finally: os.chdir(previousDirectory)
+
+
+def benchmarkImportTime(repeat=5):
+    """
+    measures the import time of the library in fresh interpreters with 'python -X importtime', then builds a url
+    :param repeat: optional number of interpreters, the fastest import is kept
+    :return: seconds, loaded: best cumulative import time and the lazyModules loaded by the url-only path
+    """
+    libraryDirectory = os.path.dirname(os.path.abspath(__file__))
+    code = str("import sys, NavigatorURLScheme; NavigatorURLScheme.NavigatorURLScheme({{'stops': [['43.6,-70.2', 'Stop']]}}).generateURL(); "
+               "print(','.join(module for module in {!r} if module in sys.modules))").format(lazyModules)
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)  # time the import as deployed, not the compile
+    seconds, loaded = None, []
+    for run in range(repeat + 1):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=libraryDirectory, env=environment,
+                                 capture_output=True, text=True, check=True)
+        loaded = [module for module in process.stdout.strip().split(",") if module]
+        for line in process.stderr.splitlines():
+            if line.rstrip().endswith("| NavigatorURLScheme") and run > 0:  # the first run only warms the bytecode cache
+                cumulative = int(line.split("|")[1]) / 1e6
+                seconds = cumulative if seconds is None else min(seconds, cumulative)
+    return seconds, loaded
+
+
+def runSuite(size="quick", repeat=3, only=None):
+    """
+    runs every benchmark on every dataset of a size
+    :param size: optional "quick" or "full"
+    :param repeat: optional number of timings per benchmark, the best is kept
+    :param only: optional list of benchmark names to run
+    :return: results: {benchmark[routes=..,stops=..]: {"items", "seconds", "itemsPerSecond"}}
+    """
+    results = {}
+    selected = lambda name: not only or name in only
+    if selected("importURLScheme"):
+        seconds, _ = benchmarkImportTime(repeat)
+        results["importURLScheme"] = {"items": 1, "seconds": seconds, "itemsPerSecond": 1 / seconds}
+    hyperlinks, qrCode = NavigatorURLHyperlinks(), NavigatorURLQRCode()
+    for routeCount, stopsPerRoute in datasets(size):
+        label = "[routes={},stops={}]".format(routeCount, stopsPerRoute)
+        parameterDictionaries = syntheticParameterDictionaries(min(routeCount, distinctRoutesPerDataset), stopsPerRoute)
+        urls = list(NavigatorURLScheme.generateMany(parameterDictionaries))
+        validURLs = [[url, "Route " + str(number)] for number, url in enumerate(urls)]
+        benchmarks = {
+            "generateURL": lambda: [NavigatorURLScheme(parameterDictionary).generateURL() for parameterDictionary in cycled(parameterDictionaries, routeCount)],
+            "generateMany": lambda: list(NavigatorURLScheme.generateMany(cycled(parameterDictionaries, routeCount))),
+            "generateManyEncodingCache": lambda: list(NavigatorURLScheme.generateMany(cycled(parameterDictionaries, routeCount), encodingCache=NavigatorURLEncodingCache())),
+            "parseMany": lambda: list(NavigatorURLScheme.parseMany(cycled(urls, routeCount))),
+            "validateURL": lambda: [NavigatorURLScheme({})._validateURL(url) for url in cycled(urls, routeCount)],
+            "generateHTMLpage": lambda: hyperlinks.generateHTMLpage(cycled(validURLs, routeCount), "Benchmark"),
+            "generateStyledHTMLpage": lambda: hyperlinks.generateStyledHTMLpage(cycled(validURLs, routeCount), "Benchmark", styleFile="style.css"),
+        }
+        with quietDirectory() as directory:
+            for name, function in benchmarks.items():
+                if selected(name): results[name + label] = timed(function, routeCount, repeat)
+            if selected("orderStops") and stopsPerRoute > 1:
+                try:
+                    stopOrder = NavigatorURLStopOrder()
+                except ImportError:
+                    stopOrder = None  # numpy is optional
+                if stopOrder is not None:
+                    orderedRoutes = max(1, min(routeCount, distinctRoutesPerDataset, orderedStopsPerDataset // stopsPerRoute))
+                    coordinateDictionaries = syntheticParameterDictionaries(orderedRoutes, stopsPerRoute, addressShare=0)
+                    results["orderStops[routes={},stops={}]".format(orderedRoutes, stopsPerRoute)] = timed(
+                        lambda: list(stopOrder.orderMany(coordinateDictionaries)), orderedRoutes, repeat)
+            if selected("csv2Lists"):
+                csvLocation = os.path.join(directory, "links.csv")
+                with open(csvLocation, 'w', newline='') as csvFile:
+                    writer = csv.writer(csvFile)
+                    writer.writerow(["applink", "title", "result", "group"])
+                    writer.writerows(validURL + ["PASS", "Benchmark"] for validURL in cycled(validURLs, routeCount))
+                results["csv2Lists" + label] = timed(lambda: hyperlinks.csv2Lists(csvLocation), routeCount, repeat)
+            qrURLs = [url for url in urls if qrCode.qrVersion(url) is not None][:datasetSizes[size]["maxQRCodes"]]
+            if qrURLs and routeCount == datasetSizes[size]["routes"][0]:
+                qrLabel = "[codes={},stops={}]".format(len(qrURLs), stopsPerRoute)
+                if selected("saveQRCodePNG"):
+                    results["saveQRCodePNG" + qrLabel] = timed(lambda: [qrCode.saveQRCodePNG(url, "qr") for url in qrURLs], len(qrURLs), 1)
+                if selected("saveQRCodeSVG"):
+                    results["saveQRCodeSVG" + qrLabel] = timed(lambda: [qrCode.saveQRCodeSVG(url, "qr") for url in qrURLs], len(qrURLs), 1)
+    return results
+
+
+def compareResults(baseline, current, threshold=0.10):
+    """
+    compares two result files benchmark by benchmark
+    :param baseline: results dictionary of the earlier run
+    :param current: results dictionary of the later run
+    :param threshold: optional fraction of throughput that may be lost before a benchmark counts as regressed
+    :return: regressions: list of (name, ratio) for each regressed benchmark
+    """
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        ratio = current[name]["itemsPerSecond"] / baseline[name]["itemsPerSecond"]
+        regressed = ratio < 1 - threshold
+        if regressed: regressions.append((name, ratio))
+        print("{:<60} {:>12.0f} -> {:>12.0f} items/sec  {:.2f}x{}".format(
+            name, baseline[name]["itemsPerSecond"], current[name]["itemsPerSecond"], ratio, "  REGRESSION" if regressed else ""))
+    for name in sorted(set(baseline) ^ set(current)):
+        print("{:<60} only in the {} run".format(name, "baseline" if name in baseline else "current"))
+    return regressions
+
+
+def measureStops(stopCount=1000000, stopsPerRoute=(10, 20, 40), precisions=(6, 5)):
+    """
+    compares the usual list of [location, name] strings with NavigatorURLStops: memory per stop and url length / QR version
+    :param stopCount: optional number of stops held for the memory measurement
+    :param stopsPerRoute: optional route sizes for the url length measurement
+    :param precisions: optional NavigatorURLStops precisions compared
+    :return: report: {"bytesPerMillionStops": {...}, "urlLength": {...}, "qrVersion": {...}}
+    """
+    generator = random.Random(0)
+    coordinates = [(generator.uniform(43.5, 43.8), generator.uniform(-70.4, -70.1)) for _ in range(stopCount)]
+    report = {"bytesPerMillionStops": {}, "urlLength": {}, "qrVersion": {}}
+    builders = {"lists": lambda: [[repr(latitude) + "," + repr(longitude), "Customer " + str(number % 1000)]
+                                  for number, (latitude, longitude) in enumerate(coordinates)],
+                "NavigatorURLStops": lambda: NavigatorURLStops.fromLists((latitude, longitude, "Customer " + str(number % 1000))
+                                                                         for number, (latitude, longitude) in enumerate(coordinates))}
+    for name, build in builders.items():
+        tracemalloc.start()
+        stops = build()
+        report["bytesPerMillionStops"][name] = tracemalloc.get_traced_memory()[0] * 1000000 // stopCount
+        tracemalloc.stop()
+        del stops
+    qrCode = NavigatorURLQRCode()
+    for routeStops in stopsPerRoute:
+        route = [[repr(latitude) + "," + repr(longitude), "Customer " + str(number)] for number, (latitude, longitude) in enumerate(coordinates[:routeStops])]
+        variants = {"lists": route}
+        for precision in precisions: variants["precision=" + str(precision)] = NavigatorURLStops.fromLists(route, precision)
+        for name, stops in variants.items():
+            url = NavigatorURLScheme({"start": ["43.633332,-70.259971", "Depot"], "stops": stops}).generateURL()
+            report["urlLength"]["{}[stops={}]".format(name, routeStops)] = len(url)
+            report["qrVersion"]["{}[stops={}]".format(name, routeStops)] = qrCode.qrVersion(url)
+    return report
+
+
+def benchmarkXLSX(rowCount=100000, repeat=1):
+    """
+    compares reading the stops of an xlsx sheet with NavigatorURLRoutes.xlsx2Routes against the cell by cell xlrd loop of
+    'Sample Data/NavigatorURLScheme_sampleRead_CSV_XLSX.py' and against csv2Routes on the same sheet saved as csv
+    :param rowCount: optional number of stop rows in the sheet (10 columns, location and name in the 5th and 6th)
+    :param repeat: optional number of timings per reader, the best is kept
+    :return: results: {reader: {"items", "seconds", "itemsPerSecond"}}, readers whose package is missing are left out
+    """
+    import openpyxl
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        xlsxLocation, csvLocation = os.path.join(directory, "stops.xlsx"), os.path.join(directory, "stops.csv")
+        generator = random.Random(0)
+        header = ["id", "driver", "date", "notes", "location", "name", "route", "sequence", "weight", "comment"]
+        workbook = openpyxl.Workbook()  # not write-only so strings are shared like in sheets saved by Excel
+        sheet = workbook.active
+        sheet.title = "Stops"
+        sheet.append(header)
+        with open(csvLocation, 'w', newline='') as csvFile:
+            writer = csv.writer(csvFile)
+            writer.writerow(header)
+            for number in range(rowCount):
+                row = [number, "Driver " + str(number % 50), "2024-01-01", "", "{:.6f},{:.6f}".format(generator.uniform(43.5, 43.8), generator.uniform(-70.4, -70.1)),
+                       "Stop " + str(number), number // 20, number % 20, 12.5, "leave at door"]
+                sheet.append(row)
+                writer.writerow(row)
+        workbook.save(xlsxLocation)
+        routes = NavigatorURLRoutes(locationColumn=4, nameColumn=5)
+        results["xlsx2Routes"] = timed(lambda: list(routes.xlsx2Routes(xlsxLocation)), rowCount, repeat)
+        results["csv2Routes"] = timed(lambda: list(routes.csv2Routes(csvLocation)), rowCount, repeat)
+        try:
+            import xlrd
+        except ImportError:
+            return results
+
+        def xlrdCellLoop():
+            sheet = xlrd.open_workbook(xlsxLocation).sheet_by_index(0)
+            start, stops = [], []
+            for rowIndex in range(1, sheet.nrows):
+                location = [str(sheet.cell(rowIndex, 4)), str(sheet.cell(rowIndex, 5))]
+                if rowIndex == 1: start = location
+                else: stops.append(location)
+            return start, stops
+        try: results["xlrdCellLoop"] = timed(xlrdCellLoop, rowCount, repeat)
+        except xlrd.biffh.XLRDError: pass  # xlrd 2 only reads xls
+    return results
+
+
+def benchmarkQRBackends(versions=(1, 5, 10, 20, 30, 40), scale=10, error='L', repeat=3):
+    """
+    compares the PNG rendering of the pyqrcode and numpy QR backends per QR version, on urls filling each version
+    :param versions: optional QR versions measured
+    :param scale: optional size of each QR module in pixels
+    :param error: optional QR error correction level
+    :param repeat: optional number of timings per backend, the best is kept
+    :return: results: {version: {"pyqrcode", "numpy": seconds per image (rendering only, the encoding is shared), "identical": boolean}}
+    """
+    backends = {"pyqrcode": NavigatorURLPyQRCodeBackend(), "numpy": NavigatorURLNumPyQRCodeBackend()}
+    qrCode = NavigatorURLQRCode()
+    results = {}
+    for version in versions:
+        url = ("arcgis-navigator://?stop=" + "x" * 3000)[:qrCode.qrCapacity(error, version)]
+        encoded = backends["pyqrcode"].encode(url, error, version)
+        images, results[version] = {}, {}
+        for name, backend in backends.items():
+            count = max(1, 200 // version)
+            def render():
+                for _ in range(count):
+                    image = io.BytesIO()
+                    backend.render(encoded, "png", image, scale)
+                images[name] = image.getvalue()
+            results[version][name] = timed(render, count, repeat)["seconds"] / count
+        results[version]["identical"] = images["pyqrcode"] == images["numpy"]
+    return results
+
+
+def measureAddressCache(routeCount=200, stopsPerRoute=(5, 10, 20), precision=6):
+    """
+    measures the url length and QR version of address routes before and after the NavigatorURLAddressCache pre-pass, with a
+    stand-in csv geocoder placing every address of the synthetic routes and 'Sample Data/applink_testcases.csv' near Portland
+    :param routeCount: optional number of synthetic routes per route size (all stops given as an address)
+    :param stopsPerRoute: optional synthetic route sizes
+    :param precision: optional number of decimals of the coordinates
+    :return: report: {dataset: {"routes", "meanURLLength", "meanQRVersion", "tooLongForQR": (before, after)}, "geocoderRequests",
+             "geocoded", "secondRun": {"geocoderRequests", "cacheHits"}}
+    """
+    datasets = collections.OrderedDict()
+    for routeStops in stopsPerRoute:
+        datasets["synthetic[stops={}]".format(routeStops)] = syntheticParameterDictionaries(routeCount, routeStops, seed=routeStops, addressShare=1.0)
+    with open(os.path.join("Sample Data", "applink_testcases.csv"), newline='') as csvFile:
+        samples = []
+        for row in csv.DictReader(csvFile):
+            try: samples.append(NavigatorURLScheme.parse(row["applink"], strict=False))
+            except ValueError: pass
+    datasets["applink_testcases.csv"] = samples
+    generator = random.Random(0)
+    qrCode = NavigatorURLQRCode()
+    report = collections.OrderedDict()
+    with tempfile.TemporaryDirectory() as directory:
+        tableLocation, cacheLocation = os.path.join(directory, "addresses.csv"), os.path.join(directory, "addresses.sqlite")
+        with open(tableLocation, 'w', newline='') as tableFile:
+            writer = csv.writer(tableFile)
+            writer.writerow(["address", "latitude", "longitude"])
+            for parameterDictionaries in datasets.values():
+                for parameterDictionary in parameterDictionaries:
+                    for location in [parameterDictionary.get("start")] + list(parameterDictionary.get("stops") or []):
+                        if location: writer.writerow([location[0], generator.uniform(43.5, 43.8), generator.uniform(-70.4, -70.1)])
+        geocoder = NavigatorURLCSVGeocoder(tableLocation)
+        addressCache = NavigatorURLAddressCache(cacheLocation, geocoder, precision)
+        for name, parameterDictionaries in datasets.items():
+            lengths, versions = {}, {}
+            for variant, cache in (("before", None), ("after", addressCache)):
+                urls = list(NavigatorURLScheme.generateMany(parameterDictionaries, validate=False, addressCache=cache))
+                lengths[variant] = [len(url) for url in urls]
+                versions[variant] = [qrCode.qrVersion(url) for url in urls]
+            fitting = [number for number, version in enumerate(versions["before"]) if version is not None]  # same routes before/after
+            mean = lambda values: sum(values) / max(1, len(values))
+            report[name] = {"routes": len(parameterDictionaries),
+                            "meanURLLength": tuple(mean(lengths[variant]) for variant in ("before", "after")),
+                            "meanQRVersion": tuple(mean([versions[variant][number] for number in fitting]) for variant in ("before", "after")),
+                            "tooLongForQR": tuple(versions[variant].count(None) for variant in ("before", "after"))}
+        report["geocoderRequests"], report["geocoded"] = geocoder.requests, addressCache.misses
+        addressCache.close()
+        geocoder.requests = 0
+        addressCache = NavigatorURLAddressCache(cacheLocation, geocoder, precision)
+        for parameterDictionaries in datasets.values():
+            for _ in NavigatorURLScheme.generateMany(parameterDictionaries, validate=False, addressCache=addressCache): pass
+        report["secondRun"] = {"geocoderRequests": geocoder.requests, "cacheHits": addressCache.hits}
+        addressCache.close()
+    return report
+
+
+def checkTargets():
+    """
+    checks the throughput targets above
+    :return: failures: list of messages for each missed target
+    """
+    failures = []
+    parameterDictionaries = syntheticParameterDictionaries(20000, 10, addressShare=0)  # coordinate stops, the targets were set on them
+    perObject = timed(lambda: [NavigatorURLScheme(parameterDictionary).generateURL() for parameterDictionary in parameterDictionaries], 20000, 5)
+    batch = timed(lambda: list(NavigatorURLScheme.generateMany(parameterDictionaries)), 20000, 5)
+    batchSpeedup = batch["itemsPerSecond"] / perObject["itemsPerSecond"]
+    print("per-object generateURL: {:.0f} urls/sec".format(perObject["itemsPerSecond"]))
+    print("generateMany:           {:.0f} urls/sec ({:.2f}x)".format(batch["itemsPerSecond"], batchSpeedup))
+    if batchSpeedup < batchSpeedupTarget:
+        failures.append("generateMany is below its target of {:.2f}x the per-object path".format(batchSpeedupTarget))
+    # routes over 500 repeated customer addresses
+    repeated = [{"start": ["100 Commercial St, Portland, ME, 04101", "Portland Depot"],
+                 "stops": [[str(address) + " Congress St, Portland, ME, 04101", "Customer " + str(address)]
+                           for address in ((route * 7 + stop * 13) % 500 for stop in range(10))]} for route in range(20000)]
+    uncached = timed(lambda: [NavigatorURLScheme(parameterDictionary).generateURL() for parameterDictionary in repeated], 20000, 5)
+    cached = timed(lambda: list(NavigatorURLScheme.generateMany(repeated, encodingCache=NavigatorURLEncodingCache())), 20000, 5)
+    speedup = cached["itemsPerSecond"] / uncached["itemsPerSecond"]
+    print("repeated addresses:     {:.0f} urls/sec uncached, {:.0f} urls/sec cached ({:.2f}x)".format(
+        uncached["itemsPerSecond"], cached["itemsPerSecond"], speedup))
+    if speedup < encodingCacheSpeedupTarget:
+        failures.append("the encoding cache is below its target of {:.2f}x".format(encodingCacheSpeedupTarget))
+    urls = list(NavigatorURLScheme.generateMany(parameterDictionaries))
+    # callback schemes are written unencoded, including the '+' and '%' the other values are decoded from
+    callbacks = [["arcgis-collector://?", "Collector for ArcGIS"], ["my-app+beta://x%41", "My+App 100%"], ["a+b://"], ["app://done?id=%2F"]]
+    roundTrip = urls + list(NavigatorURLScheme.generateMany(dict(parameterDictionary, callback=callback)
+                                                            for parameterDictionary, callback in zip(parameterDictionaries, callbacks * 250)))
+    if list(NavigatorURLScheme.generateMany(NavigatorURLScheme.parseMany(roundTrip))) != roundTrip:
+        failures.append("parse did not round-trip through generateURL")
+    parse = timed(lambda: list(NavigatorURLScheme.parseMany(urls)), 20000, 5)
+    print("parseMany:              {:.0f} urls/sec".format(parse["itemsPerSecond"]))
+    if parse["itemsPerSecond"] < parseThroughputTarget:
+        failures.append("parseMany is below its throughput target of {} urls/sec".format(parseThroughputTarget))
+    seconds, loaded = benchmarkImportTime()
+    print("import NavigatorURLScheme: {:.1f} ms".format(seconds * 1000))
+    if seconds > importTimeBudget:
+        failures.append("importing NavigatorURLScheme is over its budget of {:.0f} ms".format(importTimeBudget * 1000))
+    if loaded:
+        failures.append("building a url imported " + ", ".join(loaded) + ", which should only load on first use")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NavigatorURLScheme benchmark suite")
+    subparsers = parser.add_subparsers(dest="command")
+    runParser = subparsers.add_parser("run", help="run the suite and write machine-readable results")
+    runParser.add_argument("--size", choices=sorted(datasetSizes), default="quick")
+    runParser.add_argument("--repeat", type=int, default=3, help="timings per benchmark, the best is kept")
+    runParser.add_argument("--only", nargs="*", help="benchmark names to run i.e. generateMany parseMany")
+    runParser.add_argument("--output", default="benchmark_results.json")
+    compareParser = subparsers.add_parser("compare", help="compare two result files and flag regressions")
+    compareParser.add_argument("baseline")
+    compareParser.add_argument("current")
+    compareParser.add_argument("--threshold", type=float, default=0.10, help="allowed loss of throughput (0.10 = 10%%)")
+    subparsers.add_parser("targets", help="check the throughput targets")
+    subparsers.add_parser("stops", help="measure memory per million stops and url length of NavigatorURLStops against lists")
+    xlsxParser = subparsers.add_parser("xlsx", help="compare xlsx2Routes with the cell by cell xlrd loop (writing the test sheet requires openpyxl)")
+    xlsxParser.add_argument("--rows", type=int, default=100000)
+    qrParser = subparsers.add_parser("qr", help="compare the PNG rendering of the pyqrcode and numpy QR backends per QR version")
+    qrParser.add_argument("--scale", type=int, default=10)
+    geocodeParser = subparsers.add_parser("geocode", help="measure the url length and QR version of address routes with the address cache pre-pass")
+    geocodeParser.add_argument("--precision", type=int, default=6)
+    arguments = parser.parse_args()
+    if arguments.command == "run":
+        results = runSuite(arguments.size, arguments.repeat, arguments.only)
+        for name, result in results.items(): print("{:<60} {:>12.0f} items/sec".format(name, result["itemsPerSecond"]))
+        with open(arguments.output, 'w') as outputFile:
+            json.dump({"meta": {"size": arguments.size, "python": platform.python_version(), "platform": platform.platform(),
+                                "date": datetime.datetime.now().isoformat()}, "results": results}, outputFile, indent=1)
+        print("Results written to " + arguments.output)
+    elif arguments.command == "compare":
+        with open(arguments.baseline) as baselineFile, open(arguments.current) as currentFile:
+            regressions = compareResults(json.load(baselineFile)["results"], json.load(currentFile)["results"], arguments.threshold)
+        if regressions:
+            print("{} benchmark(s) regressed by more than {:.0%}".format(len(regressions), arguments.threshold))
+            sys.exit(1)
+    elif arguments.command == "stops":
+        report = measureStops()
+        for name, bytesPerMillion in report["bytesPerMillionStops"].items():
+            print("{:<28} {:>8.1f} MB per million stops".format(name, bytesPerMillion / 1e6))
+        for name, length in report["urlLength"].items():
+            print("{:<28} {:>8} characters, QR version {}".format(name, length, report["qrVersion"][name]))
+    elif arguments.command == "xlsx":
+        for name, result in benchmarkXLSX(arguments.rows).items():
+            print("{:<28} {:>10.0f} rows/sec ({:.2f} s)".format(name, result["itemsPerSecond"], result["seconds"]))
+    elif arguments.command == "qr":
+        for version, result in benchmarkQRBackends(scale=arguments.scale).items():
+            print("version {:>2}: pyqrcode {:>8.2f} ms, numpy {:>6.2f} ms per image ({:.0f}x){}".format(
+                version, result["pyqrcode"] * 1000, result["numpy"] * 1000, result["pyqrcode"] / result["numpy"],
+                "" if result["identical"] else "  IMAGES DIFFER"))
+    elif arguments.command == "geocode":
+        report = measureAddressCache(precision=arguments.precision)
+        secondRun = report.pop("secondRun")
+        geocoderRequests, geocoded = report.pop("geocoderRequests"), report.pop("geocoded")
+        for name, result in report.items():
+            print("{:<26} {:>4} routes: {:>7.0f} -> {:>5.0f} characters, QR version {:>5.1f} -> {:>4.1f}, too long for a QR code {} -> {}".format(
+                name, result["routes"], result["meanURLLength"][0], result["meanURLLength"][1], result["meanQRVersion"][0],
+                result["meanQRVersion"][1], result["tooLongForQR"][0], result["tooLongForQR"][1]))
+        print("{} addresses geocoded in {} request(s); second run from the cache: {} request(s), {} hits".format(
+            geocoded, geocoderRequests, secondRun["geocoderRequests"], secondRun["cacheHits"]))
+    else:
+        failures = checkTargets()
+        for failure in failures: print(failure)
+        if failures: sys.exit(1)
@@ -0,0 +1,349 @@
+"""
+COPYRIGHT 2016 ESRI
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+import sys
+
+from NavigatorURLScheme import NavigatorURLScheme, NavigatorURLHyperlinks, NavigatorURLQRCode, NavigatorURLRoutes, NavigatorURLDirectorySink
+
+'''
+Bulk generation of navigator links from a csv or xlsx file of stops, sharded across worker processes.
+run from this directory with i.e.
+  'python -m NavigatorURLScheme_Bulk stops.csv --output-dir out --route-column route_id --location-column location --name-column name --qr png'
+every shard of routes is written to its own file and recorded in out/checkpoint.json, so a crashed job continues
+where it stopped with '--resume'. once all shards are done they are merged into out/urls.csv (or out/urls.jsonl)
+'''
+
+
+def _generateShard(shardNumber, routes, options):
+    """
+    supporting function of NavigatorURLBulkJob to build the urls (and QR codes) of one shard, defined at module level
+    so worker processes can run it. the shard file is written to a temporary name and renamed once complete
+    :param shardNumber: number of the shard
+    :param routes: list of (routeId, parameterDictionary, inputError), inputError is the message of a row that could not be read
+    :param options: dictionary of job options, see NavigatorURLBulkJob
+    :return: shardNumber, routeCount, errorCount
+    """
+    qrCode = NavigatorURLQRCode()
+    shardPath = os.path.join(options["outputDirectory"], "shards", "urls_{:06d}.{}".format(shardNumber, options["outputFormat"]))
+    errorCount = 0
+    with open(shardPath + ".part", 'w', newline='') as shardFile:
+        writer = csv.writer(shardFile) if options["outputFormat"] == "csv" else None
+        for routeId, parameterDictionary, inputError in routes:
+            url, error = "", inputError or ""
+            if inputError: errorCount += 1
+            else:
+                try:
+                    url = NavigatorURLScheme(parameterDictionary).generateURL()
+                    if options["qrFormat"] == "png":
+                        qrCode.saveQRCodePNG(url, _qrFilename(routeId), options["qrDirectory"], scale=options["qrScale"], error=options["qrError"])
+                    elif options["qrFormat"] == "svg":
+                        qrCode.saveQRCodeSVG(url, _qrFilename(routeId), options["qrDirectory"], scale=options["qrScale"], error=options["qrError"])
+                except ValueError as routeError:
+                    error = str(routeError)
+                    errorCount += 1
+            if writer is not None: writer.writerow([routeId, url, error])
+            else: shardFile.write(json.dumps({"route": routeId, "url": url, "error": error or None}) + "\n")
+    os.replace(shardPath + ".part", shardPath)
+    return shardNumber, len(routes), errorCount
+
+
+def _qrFilename(routeId):
+    """
+    supporting function of _generateShard for the QR code file name of a route (without extension), the same
+    name NavigatorURLHyperlinks gives the QR code of a link titled routeId
+    :param routeId: route id
+    :return: file name
+    """
+    return str(routeId).replace("/", "").replace(".", "")
+
+
+class NavigatorURLBulkJob:
+    """
+    generic class for generating the links of a large stop file in shards, resumable after a crash
+    """
+    __checkpointFilename = "checkpoint.json"
+
+    def __init__(self, inputLocation, outputDirectory, locationColumn=4, nameColumn=5, routeColumn=None, sequenceColumn=None, parameters=None,
+                 outputFormat="csv", qrFormat=None, qrScale=None, qrError='L', htmlStyle=None, linksPerPage=1000, title="Bulk", workers=None,
+                 shardSize=1000, delimiter=',', sortedByRoute=True):
+        """
+        constructor for the job
+        :param inputLocation: full path to a csv or xlsx file of stops (first row is the header)
+        :param outputDirectory: directory the urls, QR codes, pages and checkpoint are written to
+        :param locationColumn: optional header name or zero based index of the coord/address column
+        :param nameColumn: optional header name or index of the stop name column
+        :param routeColumn: optional header name or index of the route id column, None makes one link per row
+        :param sequenceColumn: optional header name or index of the order of the stops within a route
+        :param parameters: optional dictionary of parameters shared by every link i.e. {"travelmode": "driving time"}
+        :param outputFormat: optional "csv" or "jsonl"
+        :param qrFormat: optional "png" or "svg" to save a QR code per link, None saves none
+        :param qrScale: optional size of each QR module (None uses the saveQRCodePNG/saveQRCodeSVG default)
+        :param qrError: optional QR error correction level
+        :param htmlStyle: optional "plain" or "styled" to write html pages of the links, None writes none
+        :param linksPerPage: optional number of links per html page
+        :param title: optional title of the html pages
+        :param workers: optional number of worker processes (None uses one per cpu)
+        :param shardSize: optional number of links per shard (and checkpoint)
+        :param delimiter: optional csv delimiter
+        :param sortedByRoute: optional boolean, False sorts the rows by route on disk first
+        """
+        self.__inputLocation = str(inputLocation)
+        self.__outputDirectory = str(outputDirectory)
+        self.__columns = [locationColumn, nameColumn, routeColumn, sequenceColumn]
+        self.__parameters = parameters if parameters is not None else {}
+        self.__options = {"outputDirectory": self.__outputDirectory, "outputFormat": outputFormat, "qrFormat": qrFormat,
+                          "qrDirectory": os.path.join(self.__outputDirectory, "qrcodes", ""),
+                          "qrScale": qrScale if qrScale is not None else (10 if qrFormat == "png" else 4), "qrError": qrError}
+        self.__htmlStyle = htmlStyle
+        self.__linksPerPage = linksPerPage
+        self.__title = title
+        self.__workers = workers or os.cpu_count() or 1
+        self.__shardSize = shardSize
+        self.__delimiter = delimiter
+        self.__sortedByRoute = sortedByRoute
+
+    def run(self, resume=False):
+        """
+        generates every link, skipping the shards a previous run completed when resuming
+        :param resume: optional boolean, True continues from the checkpoint of an earlier run of the same job
+        :return: summary: {"routes", "errors", "shards"}
+        """
+        checkpoint = self._loadCheckpoint(resume)
+        if checkpoint["complete"]:
+            print("Job already complete, nothing to do")
+            return {"routes": checkpoint["routes"], "errors": checkpoint["errors"], "shards": checkpoint["shards"]}
+        os.makedirs(os.path.join(self.__outputDirectory, "shards"), exist_ok=True)
+        if self.__options["qrFormat"]: os.makedirs(self.__options["qrDirectory"], exist_ok=True)
+        routes = itertools.islice(self._inputRoutes(), checkpoint["shards"] * self.__shardSize, None)
+        shards = enumerate(iter(lambda: list(itertools.islice(routes, self.__shardSize)), []), checkpoint["shards"])
+        with concurrent.futures.ProcessPoolExecutor(self.__workers) as pool:
+            pending = collections.deque()
+            for shardNumber, shardRoutes in shards:
+                pending.append(pool.submit(_generateShard, shardNumber, shardRoutes, self.__options))
+                if len(pending) >= self.__workers * 2: self._completedShard(pending.popleft().result(), checkpoint)
+            while pending:
+                self._completedShard(pending.popleft().result(), checkpoint)
+        self._mergeShards(checkpoint["shards"])
+        if self.__htmlStyle: self._writeHTMLpages()
+        checkpoint["complete"] = True
+        self._saveCheckpoint(checkpoint)
+        print("Generated " + str(checkpoint["routes"]) + " links (" + str(checkpoint["errors"]) + " errors) in " + self.__outputDirectory)
+        return {"routes": checkpoint["routes"], "errors": checkpoint["errors"], "shards": checkpoint["shards"]}
+
+    def _inputRoutes(self):
+        """
+        supporting function of run to stream (routeId, parameterDictionary, inputError) out of the input file. rows too
+        short for the mapped columns do not stop the job, they are reported after the routes (in the same order on every
+        run, so resuming skips the same links)
+        :return: yields routeId, parameterDictionary, None for each link, then routeId, None, inputError for each bad row
+        """
+        rows = self._inputRows()
+        locationColumn, nameColumn, routeColumn, sequenceColumn = self.__columns
+        routes = NavigatorURLRoutes(locationColumn, nameColumn, routeColumn, sequenceColumn, self.__parameters)
+        header = next(rows, [])
+        inputErrors = []
+        rows = self._checkedRows(rows, routes._columnIndices(header), inputErrors)
+        if routeColumn is None:
+            # one link per row: number the rows as routes (after the mapped columns) and make each location a stop
+            width = max([len(header)] + [column + 1 for column in self.__columns if isinstance(column, int)])
+            rows = itertools.chain([header + [""] * (width - len(header)) + ["__row"]],
+                                   ((row + [""] * width)[:width] + [str(rowNumber)] for rowNumber, row in rows))
+            for routeId, parameterDictionary in NavigatorURLRoutes(locationColumn, nameColumn, width).rows2Routes(rows):
+                yield routeId, dict(self.__parameters, stops=[parameterDictionary["start"]]), None
+        else:
+            rows = itertools.chain([header], (row for _, row in rows))
+            for routeId, parameterDictionary in routes.rows2Routes(rows, self.__sortedByRoute): yield routeId, parameterDictionary, None
+        for routeId, inputError in inputErrors: yield routeId, None, inputError
+
+    def _checkedRows(self, rows, indices, inputErrors):
+        """
+        supporting function of _inputRoutes to set aside the rows missing the location, route or sequence column
+        :param rows: iterable of rows after the header
+        :param indices: dictionary of column indices, see NavigatorURLRoutes
+        :param inputErrors: list the (routeId, message) of each row set aside is appended to
+        :return: yields dataRowNumber, row for the other non blank rows (the first row after the header is 1)
+        """
+        required = [index for key, index in indices.items() if key != "name" and index is not None]
+        columnCount = max(required) + 1 if required else 0
+        for rowNumber, row in enumerate(rows, 1):
+            if not row: continue
+            if len(row) < columnCount:
+                routeId = row[indices["route"]] if indices["route"] is not None and indices["route"] < len(row) else str(rowNumber)
+                inputErrors.append((routeId, "Row " + str(rowNumber + 1) + " has " + str(len(row)) + " columns, the mapped columns need " + str(columnCount)))
+                continue
+            yield rowNumber, row
+
+    def _inputRows(self):
+        """
+        supporting function of _inputRoutes to read the rows of the csv or xlsx input file (only the mapped xlsx columns are read)
+        :return: yields each row as a list of strings, header first
+        """
+        if self.__inputLocation.lower().endswith((".xlsx", ".xlsm")):
+            for row in NavigatorURLRoutes(*self.__columns).xlsx2Rows(self.__inputLocation): yield row
+            return
+        with open(self.__inputLocation, newline='') as csvFile:
+            for row in csv.reader(csvFile, delimiter=self.__delimiter): yield row
+
+    def _completedShard(self, shardResult, checkpoint):
+        """
+        supporting function of run to record a finished shard, shards complete in order so the checkpoint is a count
+        :param shardResult: shardNumber, routeCount, errorCount as returned by _generateShard
+        :param checkpoint: the checkpoint dictionary
+        """
+        shardNumber, routeCount, errorCount = shardResult
+        checkpoint["shards"] = shardNumber + 1
+        checkpoint["routes"] += routeCount
+        checkpoint["errors"] += errorCount
+        self._saveCheckpoint(checkpoint)
+        if checkpoint["shards"] % 100 == 0: print("Completed " + str(checkpoint["shards"]) + " shards (" + str(checkpoint["routes"]) + " links)")
+
+    def _mergeShards(self, shardCount):
+        """
+        supporting function of run to concatenate the shard files into a single output file and remove them
+        :param shardCount: number of shards
+        """
+        import shutil
+        outputFormat = self.__options["outputFormat"]
+        outputPath = os.path.join(self.__outputDirectory, "urls." + outputFormat)
+        with open(outputPath + ".part", 'w', newline='') as outputFile:
+            if outputFormat == "csv": csv.writer(outputFile).writerow(["route", "url", "error"])
+            for shardNumber in range(shardCount):
+                with open(self._shardPath(shardNumber), newline='') as shardFile: shutil.copyfileobj(shardFile, outputFile)
+        os.replace(outputPath + ".part", outputPath)
+        for shardNumber in range(shardCount): os.remove(self._shardPath(shardNumber))
+        shutil.rmtree(os.path.join(self.__outputDirectory, "shards"), ignore_errors=True)  # and any .part left by a crash
+
+    def _writeHTMLpages(self):
+        """
+        supporting function of run to write the html pages of the merged links into the output directory
+        (the QR codes are saved under qrcodes/ by the shards, the pages link the urls only)
+        """
+        outputPath = os.path.join(self.__outputDirectory, "urls." + self.__options["outputFormat"])
+        with open(outputPath, newline='') as outputFile:
+            if self.__options["outputFormat"] == "csv":
+                rows = csv.reader(outputFile)
+                next(rows, None)
+                validURLs = ([row[1], row[0]] for row in rows if not row[2])
+            else:
+                validURLs = ([record["url"], record["route"]] for record in map(json.loads, outputFile) if not record["error"])
+            hyperlinks = NavigatorURLHyperlinks(sink=NavigatorURLDirectorySink(self.__outputDirectory))
+            if self.__htmlStyle == "styled": hyperlinks.generateStyledHTMLpage(validURLs, self.__title, linksPerPage=self.__linksPerPage)
+            else: hyperlinks.generateHTMLpage(validURLs, self.__title, linksPerPage=self.__linksPerPage)
+
+    def _shardPath(self, shardNumber):
+        """
+        supporting function of run for the file of a shard (same name as _generateShard)
+        :param shardNumber: number of the shard
+        :return: path of the shard file
+        """
+        return os.path.join(self.__outputDirectory, "shards", "urls_{:06d}.{}".format(shardNumber, self.__options["outputFormat"]))
+
+    def _jobDescription(self):
+        """
+        supporting function of the checkpoint to describe everything that changes which links land in which shard
+        :return: description dictionary
+        """
+        return {"input": os.path.abspath(self.__inputLocation), "inputSize": os.path.getsize(self.__inputLocation),
+                "columns": self.__columns,
+                "parameters": self.__parameters, "shardSize": self.__shardSize, "sortedByRoute": self.__sortedByRoute,
+                "options": dict((key, value) for key, value in self.__options.items() if key not in ("outputDirectory", "qrDirectory"))}
+
+    def _loadCheckpoint(self, resume):
+        """
+        supporting function of run to start a new checkpoint or load the one to resume from
+        :param resume: boolean, True continues from an existing checkpoint
+        :return: checkpoint: {"job", "shards", "routes", "errors", "complete"}
+        """
+        checkpointPath = os.path.join(self.__outputDirectory, self.__checkpointFilename)
+        job = json.loads(json.dumps(self._jobDescription()))  # compare as it reads back from json
+        if os.path.exists(checkpointPath):
+            if not resume: raise ValueError("A checkpoint already exists in " + self.__outputDirectory + ", use --resume or another output directory")
+            with open(checkpointPath) as checkpointFile: checkpoint = json.load(checkpointFile)
+            if checkpoint["job"] != job: raise ValueError("The checkpoint in " + self.__outputDirectory + " belongs to a different job")
+            if not checkpoint["complete"]: print("Resuming after " + str(checkpoint["shards"]) + " shards (" + str(checkpoint["routes"]) + " links)")
+            return checkpoint
+        os.makedirs(self.__outputDirectory, exist_ok=True)
+        checkpoint = {"job": job, "shards": 0, "routes": 0, "errors": 0, "complete": False}
+        self._saveCheckpoint(checkpoint)
+        return checkpoint
+
+    def _saveCheckpoint(self, checkpoint):
+        """
+        supporting function of run to replace the checkpoint file atomically
+        :param checkpoint: the checkpoint dictionary
+        """
+        checkpointPath = os.path.join(self.__outputDirectory, self.__checkpointFilename)
+        with open(checkpointPath + ".part", 'w') as checkpointFile: json.dump(checkpoint, checkpointFile)
+        os.replace(checkpointPath + ".part", checkpointPath)
+
+
+def _column(value):
+    """
+    supporting function of the command line for a column given as header name or zero based index
+    :param value: argument string
+    :return: int index or the header name
+    """
+    return int(value) if value.isdigit() else value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m NavigatorURLScheme_Bulk", description="Generate navigator links from a csv or xlsx file of stops")
+    parser.add_argument("input", help="csv or xlsx file of stops, the first row is the header")
+    parser.add_argument("--output-dir", required=True, help="directory for urls, QR codes, pages and the checkpoint")
+    parser.add_argument("--location-column", type=_column, default=4, help="header name or zero based index of the coord/address")
+    parser.add_argument("--name-column", type=_column, default=5, help="header name or index of the stop name")
+    parser.add_argument("--route-column", type=_column, default=None, help="header name or index of the route id (omit for one link per row)")
+    parser.add_argument("--sequence-column", type=_column, default=None, help="header name or index of the stop order within a route")
+    parser.add_argument("--unsorted", action="store_true", help="the rows of a route are not consecutive (sorts on disk)")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--travel-mode", help="i.e. 'driving time'")
+    parser.add_argument("--optimize", choices=["true", "false"])
+    parser.add_argument("--navigate", choices=["true", "false"])
+    parser.add_argument("--callback", nargs="+", metavar=("SCHEME", "PROMPT"), help="callback scheme and optional prompt")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv", help="format of the url output")
+    parser.add_argument("--qr", choices=["png", "svg"], help="save a QR code per link under qrcodes/")
+    parser.add_argument("--qr-scale", type=int, default=None)
+    parser.add_argument("--qr-error", choices=["L", "M", "Q", "H"], default="L")
+    parser.add_argument("--html", choices=["plain", "styled"], help="write html pages of the links")
+    parser.add_argument("--links-per-page", type=int, default=1000)
+    parser.add_argument("--title", default="Bulk", help="title of the html pages")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default one per cpu)")
+    parser.add_argument("--shard-size", type=int, default=1000, help="links per shard and checkpoint")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint in the output directory")
+    arguments = parser.parse_args()
+    parameters = {}
+    if arguments.travel_mode: parameters["travelmode"] = arguments.travel_mode
+    if arguments.optimize: parameters["optimize"] = arguments.optimize
+    if arguments.navigate: parameters["navigate"] = arguments.navigate
+    if arguments.callback: parameters["callback"] = arguments.callback[:2]
+    job = NavigatorURLBulkJob(arguments.input, arguments.output_dir, arguments.location_column, arguments.name_column, arguments.route_column,
+                              arguments.sequence_column, parameters, arguments.format, arguments.qr, arguments.qr_scale,
+                              arguments.qr_error, arguments.html, arguments.links_per_page, arguments.title, arguments.workers,
+                              arguments.shard_size, arguments.delimiter, not arguments.unsorted)
+    try:
+        summary = job.run(arguments.resume)
+    except (ValueError, ImportError, OSError) as jobError:
+        print("Error: " + str(jobError))
+        sys.exit(1)
+    if summary["errors"]: sys.exit(2)
@@ -0,0 +1,249 @@
+"""
+COPYRIGHT 2016 ESRI
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import time
+import urllib.parse
+
+from NavigatorURLScheme import NavigatorURLScheme, NavigatorURLQRCode
+
+'''
+Embeddable asyncio http service for generating navigator links and QR codes on demand.
+run from this directory with 'python NavigatorURLScheme_Service.py serve --port 8080', then POST a parameter dictionary
+as json to /url, /png or /svg (QR options as query string i.e. /png?scale=10&error=L).
+'python NavigatorURLScheme_Service.py loadtest --port 8080' reports latency percentiles and requests/sec of a running service
+'''
+
+
+def _renderQRCode(validURL, imageFormat, scale, error):
+    """
+    supporting function of NavigatorURLService to render a QR code, defined at module level so worker processes can run it
+    :return: the image bytes
+    """
+    return NavigatorURLQRCode().renderQRCode(validURL, imageFormat, None, scale=scale, error=error)
+
+
+class LRUCache:
+    """
+    generic least recently used cache of a bounded number of items
+    """
+    def __init__(self, maxItems=10000):
+        """
+        constructor for the cache
+        :param maxItems: optional number of items kept before the least recently used is evicted
+        """
+        self.__items = collections.OrderedDict()
+        self.__maxItems = maxItems
+        self.hits, self.misses = 0, 0
+
+    def get(self, key):
+        """
+        looks up a key and marks it recently used
+        :param key: hashable key
+        :return: the cached value or None
+        """
+        value = self.__items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.__items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        stores a value, evicting the least recently used item when full
+        :param key: hashable key
+        :param value: value to cache (not None)
+        """
+        self.__items[key] = value
+        self.__items.move_to_end(key)
+        if len(self.__items) > self.__maxItems: self.__items.popitem(last=False)
+
+
+class NavigatorURLService:
+    """
+    generic class for serving urls and QR codes over http with asyncio
+    """
+    __contentTypes = {"url": "application/json", "png": "image/png", "svg": "image/svg+xml"}
+    __reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+    def __init__(self, urlCacheSize=100000, imageCacheSize=10000, qrWorkers=None):
+        """
+        constructor for the service
+        :param urlCacheSize: optional number of urls kept in the in-process cache
+        :param imageCacheSize: optional number of rendered QR codes kept in the in-process cache
+        :param qrWorkers: optional number of processes rendering QR codes (None uses one per cpu)
+        """
+        self.urlCache = LRUCache(urlCacheSize)
+        self.imageCache = LRUCache(imageCacheSize)
+        self.__qrWorkers = qrWorkers
+        self.__executor = None
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """
+        serves requests until cancelled
+        :param host: optional interface to listen on
+        :param port: optional port to listen on
+        """
+        self.__executor = concurrent.futures.ProcessPoolExecutor(self.__qrWorkers)
+        server = await asyncio.start_server(self._handleConnection, host, port)
+        print("Serving navigator links on http://{}:{}/ ...".format(host, port))
+        try:
+            async with server: await server.serve_forever()
+        finally:
+            self.__executor.shutdown()
+
+    async def generate(self, target, parameterDictionary, scale=10, error='L'):
+        """
+        builds the url of a parameter dictionary and optionally its QR code, from the caches when possible
+        :param target: "url", "png" or "svg"
+        :param parameterDictionary: the dictionary of key/value pairs to be used when building url
+        :param scale: optional size of each QR module
+        :param error: optional QR error correction level
+        :return: the response body as bytes
+        """
+        urlKey = json.dumps(parameterDictionary, sort_keys=True)
+        url = self.urlCache.get(urlKey)
+        if url is None:
+            url = NavigatorURLScheme(parameterDictionary).generateURL()
+            self.urlCache.put(urlKey, url)
+        if target == "url": return json.dumps({"url": url}).encode("utf-8")
+        imageKey = (url, target, scale, error)
+        image = self.imageCache.get(imageKey)
+        if image is None:
+            image = await asyncio.get_running_loop().run_in_executor(self.__executor, _renderQRCode, url, target, scale, error)
+            self.imageCache.put(imageKey, image)
+        return image
+
+    async def _handleConnection(self, reader, writer):
+        """
+        supporting function of serve to answer the requests of one (keep-alive) connection
+        :param reader: asyncio stream reader
+        :param writer: asyncio stream writer
+        """
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine: break
+                method, path, _ = requestLine.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""): break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, contentType, responseBody = await self._respond(method, path, body)
+                writer.write(("HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n\r\n".format(
+                    status, self.__reasons[status], contentType, len(responseBody))).encode("latin-1") + responseBody)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close": break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method, path, body):
+        """
+        supporting function of _handleConnection to route a request
+        :param method: http method
+        :param path: request path with optional query string
+        :param body: request body bytes
+        :return: status, contentType, responseBody
+        """
+        route, _, queryString = path.partition("?")
+        target = route.strip("/")
+        if target not in self.__contentTypes: return 404, "application/json", b'{"error": "not found"}'
+        if method != "POST": return 405, "application/json", b'{"error": "use POST"}'
+        query = urllib.parse.parse_qs(queryString)
+        try:
+            parameterDictionary = json.loads(body.decode("utf-8") or "{}")
+            if not isinstance(parameterDictionary, dict): raise ValueError("The request body must be a json object")
+            scale = int(query.get("scale", ["10" if target == "png" else "4"])[0])
+            error = query.get("error", ["L"])[0].upper()
+            if error not in ("L", "M", "Q", "H"): raise ValueError("Invalid QR error correction level entered: " + error)
+            return 200, self.__contentTypes[target], await self.generate(target, parameterDictionary, scale, error)
+        except (ValueError, TypeError, IndexError) as requestError:
+            return 400, "application/json", json.dumps({"error": str(requestError)}).encode("utf-8")
+
+
+async def loadTest(host="127.0.0.1", port=8080, connections=16, requests=5000, target="url", distinctRoutes=500):
+    """
+    load-test harness for a running service
+    :param host: optional host of the service
+    :param port: optional port of the service
+    :param connections: optional number of concurrent keep-alive connections
+    :param requests: optional total number of requests
+    :param target: optional endpoint "url", "png" or "svg"
+    :param distinctRoutes: optional number of distinct routes requested (smaller means more cache hits)
+    :return: p50, p99 (seconds), requestsPerSecond
+    """
+    latencies = []
+    counter = iter(range(requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        for number in counter:
+            body = json.dumps({"start": ["43.633332,-70.259971", "Depot"],
+                               "stops": [["43.68{:04d},-70.092359".format(number % distinctRoutes), "Stop " + str(number % distinctRoutes)]]}).encode("utf-8")
+            startTime = time.perf_counter()
+            writer.write("POST /{} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n".format(
+                target, host, len(body)).encode("latin-1") + body)
+            await writer.drain()
+            statusLine = await reader.readline()
+            contentLength = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""): break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length": contentLength = int(value)
+            await reader.readexactly(contentLength)
+            if b" 200 " not in statusLine: raise ValueError("Request failed: " + statusLine.decode("latin-1").strip())
+            latencies.append(time.perf_counter() - startTime)
+        writer.close()
+
+    startTime = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(connections)])
+    elapsed = time.perf_counter() - startTime
+    latencies.sort()
+    percentile = lambda fraction: latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+    return percentile(0.50), percentile(0.99), len(latencies) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Navigator link and QR code service")
+    parser.add_argument("command", choices=["serve", "loadtest"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--qr-workers", type=int, default=None, help="processes rendering QR codes (serve)")
+    parser.add_argument("--connections", type=int, default=16, help="concurrent connections (loadtest)")
+    parser.add_argument("--requests", type=int, default=5000, help="total requests (loadtest)")
+    parser.add_argument("--target", choices=["url", "png", "svg"], default="url", help="endpoint to load (loadtest)")
+    parser.add_argument("--distinct-routes", type=int, default=500, help="distinct routes requested (loadtest)")
+    arguments = parser.parse_args()
+    if arguments.command == "serve":
+        try: asyncio.run(NavigatorURLService(qrWorkers=arguments.qr_workers).serve(arguments.host, arguments.port))
+        except KeyboardInterrupt: pass
+    else:
+        p50, p99, requestsPerSecond = asyncio.run(loadTest(arguments.host, arguments.port, arguments.connections, arguments.requests,
+                                                           arguments.target, arguments.distinct_routes))
+        print("/{}: p50 {:.2f} ms, p99 {:.2f} ms, {:.0f} requests/sec".format(arguments.target, p50 * 1000, p99 * 1000, requestsPerSecond))
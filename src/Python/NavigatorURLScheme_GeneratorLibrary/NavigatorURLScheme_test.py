@@ -0,0 +1,85 @@
+"""
+COPYRIGHT 2016 ESRI
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from NavigatorURLScheme import NavigatorURLQRCode, NavigatorURLQRCodeCache, NavigatorURLStops
+
+'''
+Regression tests for the NavigatorURLScheme library -- run from this directory with
+  'python -m unittest NavigatorURLScheme_test'  (or 'python -m pytest NavigatorURLScheme_test.py')
+'''
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyqrcode"), "QR codes require pyqrcode (pip install pyqrcode)")
+class NavigatorURLQRCodeCacheTest(unittest.TestCase):
+    """
+    tests of the on-disk QR code cache
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = NavigatorURLQRCodeCache(os.path.join(self.directory.name, "cache"))
+        self.imageDirectory = os.path.join(self.directory.name, "qrcodes")
+        self.qrCode = NavigatorURLQRCode()
+
+    def testUncachedBuildKeepsCachedImage(self):
+        """
+        an uncached build writing the image name of a cached build must not change the cached image of the first url
+        """
+        first, second = "arcgis-navigator://?stop=43.1,-70.1", "arcgis-navigator://?stop=43.2,-70.2"
+        self.qrCode.saveQRCodePNG(first, "A", self.imageDirectory, cache=self.cache)
+        self.qrCode.saveQRCodePNG(second, "A", self.imageDirectory)
+        with open(self.cache.cachePath(first), 'rb') as cachedFile: self.assertEqual(cachedFile.read(), self.qrCode.renderQRCode(first))
+        self.qrCode.saveQRCodePNG(first, "B", self.imageDirectory, cache=self.cache)
+        self.assertEqual(self.cache.hits, 1)
+        with open(os.path.join(self.imageDirectory, "B.png"), 'rb') as imageFile: self.assertEqual(imageFile.read(), self.qrCode.renderQRCode(first))
+
+    def testCachedImageIsCopied(self):
+        """
+        the image copied out of the cache is a file of its own
+        """
+        url = "arcgis-navigator://?stop=43.1,-70.1"
+        self.qrCode.saveQRCodePNG(url, "A", self.imageDirectory, cache=self.cache)
+        self.qrCode.saveQRCodePNG(url, "A", self.imageDirectory, cache=self.cache)
+        self.assertEqual(os.stat(os.path.join(self.imageDirectory, "A.png")).st_nlink, 1)
+
+
+class NavigatorURLStopsTest(unittest.TestCase):
+    """
+    tests of the compact stop list
+    """
+    def testAppendToSliceKeepsOriginal(self):
+        """
+        appending to a slice (i.e. a leg) must not change the stops it was taken from, and the other way around
+        """
+        stops = NavigatorURLStops.fromLists([["43.1,-70.1", "A"], ["43.2,-70.2", "B"], ["43.3,-70.3", "A"]])
+        original = list(stops)
+        leg = stops[1:]
+        leg.append(43.4, -70.4, "C")
+        leg.append(43.5, -70.5, "A")
+        self.assertEqual(list(stops), original)
+        self.assertEqual(stops.names, ["A", "B"])
+        stops.append(43.6, -70.6, "D")
+        self.assertEqual(list(leg), [["43.2,-70.2", "B"], ["43.3,-70.3", "A"], ["43.4,-70.4", "C"], ["43.5,-70.5", "A"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
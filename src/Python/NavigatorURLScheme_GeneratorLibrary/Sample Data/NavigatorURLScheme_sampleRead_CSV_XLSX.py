@@ -16,16 +16,13 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>
 """
 '''Needed for csv section'''
 import csv
-'''Needed for xlsx section'''
-import xlrd
-from xlrd.sheet import ctype_text
 
 '''EXAMPLE OF HOW TO BUILD URL FROM CSV OF STOPS USING 'NavigatorURLScheme' LIBRARY'''
 '''import library'''
 # if library is inside folder as your script you can use:
 # import NavigatorURLScheme
 # otherwise below references from the root folder
-from NavigatorURLScheme import NavigatorURLScheme, NavigatorURLHyperlinks
+from NavigatorURLScheme import NavigatorURLScheme, NavigatorURLHyperlinks, NavigatorURLRoutes
 
 
 csvfile_or_xlsxfile = "csv"
@@ -61,25 +58,11 @@ if csvfile_or_xlsxfile == 'csv':
                 stops.append(stop)  # add the list to the stops list
             row_count += 1  # add 1 each row
 else:
-    '''Iterate over XLXS example  --  this assumes addresses in 5th col and address names in 6th col'''
-    # open the workbook
-    xl_workbook = xlrd.open_workbook(xlsxLocation)
-    # grab the first sheet by index
-    xl_sheet = xl_workbook.sheet_by_index(0)
-    # iterate over each row in xlsx and assume 1st row is header (note the range start below)
-    row_count = 1
-    num_cols = xl_sheet.ncols   # number of columns
-    for row_idx in range(1, xl_sheet.nrows):
-        if row_count == 1:
-            start.append(str(xl_sheet.cell(row_idx, 4)))
-            start.append(str(xl_sheet.cell(row_idx, 5)))
-        else:
-            # build new list
-            stop = []  # i.e. ['43.633332,-70.259971', 'My house']
-            stop.append(str(xl_sheet.cell(row_idx, 4)))
-            stop.append(str(xl_sheet.cell(row_idx, 5)))
-            stops.append(stop)  # add the list to the stops list
-        row_count += 1  # add 1 each row
+    '''Read XLSX example  --  this assumes addresses in 5th col and address names in 6th col'''
+    # only the two mapped columns of the first sheet are read, the first row is the header and the second is the start
+    for routeId, route in NavigatorURLRoutes(locationColumn=4, nameColumn=5).xlsx2Routes(xlsxLocation):
+        start.extend(route["start"])
+        stops.extend(route.get("stops", []))
 
 '''Call to libraries -- Generate single link from data above and generate html page with clickable link'''
 # dictionary of variables -- this gets passed to build the url
@@ -0,0 +1,40 @@
+"""
+COPYRIGHT 2016 ESRI
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>
+"""
+
+'''EXAMPLE OF HOW TO BUILD ONE URL PER ROUTE FROM A LARGE CSV OF STOPS USING 'NavigatorURLScheme' LIBRARY'''
+'''import library'''
+# if library is inside folder as your script you can use:
+# import NavigatorURLScheme
+# or explicitly point to folders with dot notation
+from src.Python.NavigatorURLScheme_GeneratorLibrary.NavigatorURLScheme import NavigatorURLScheme, NavigatorURLRoutes
+
+csvLocation = ''  # <-- full path to file
+sortedByRoute = True  # <-- set to False if the rows of a route are not next to each other (sorts on disk)
+
+'''User information'''
+# column mapping -- use header names or zero based indices, the first row (by sequence) of each route is its start
+locationColumn = "location"  # <-- coord/address column
+nameColumn = "name"  # <-- optional name column (None if not used)
+routeColumn = "route_id"  # <-- route id column (None if the whole file is one route)
+sequenceColumn = "sequence"  # <-- optional order of stops within a route (None keeps file order)
+parameters = {"optimize": "false", "travelmode": "driving time"}  # <-- shared by every route
+
+'''Call to libraries -- Stream routes from the csv and generate a url per route'''
+routeReader = NavigatorURLRoutes(locationColumn, nameColumn, routeColumn, sequenceColumn, parameters)
+routes = routeReader.csv2Routes(csvLocation, sortedByRoute=sortedByRoute)
+for routeId, parameterDictionary in routes:
+    print(routeId, NavigatorURLScheme(parameterDictionary).generateURL())